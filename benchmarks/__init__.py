@@ -0,0 +1 @@
+# Benchmarks for the info counter. Run from the repository root, e.g. "python -m benchmarks.bench_counter".
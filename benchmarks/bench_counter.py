@@ -0,0 +1,164 @@
+##### Info counter benchmark #####
+
+# Description:
+# Runs the medecine_info_counter.py frame loop (capture -> scheduled inference -> post-processing ->
+# drawing -> display/record, through the same counter.stages.FrameStages object and Metrics stage
+# timers the counter uses) against a synthetic or replayed frame source and a deterministic stub
+# detector, and reports FPS plus p50/p95/p99 latency for every stage as JSON. Runs headless with no camera, GPU or
+# trained weights, so results can be compared across changes.
+#
+# Usage (from the repository root):
+#   python -m benchmarks.bench_counter --frames 500 --boxes 30 --output bench.json
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+import cv2
+import numpy as np
+
+from benchmarks.stubs import ReplayCapture, StubModel, SyntheticCapture
+from counter.catalog import Catalog
+from counter.metrics import Metrics, TimedCapture
+from counter.scheduler import AdaptiveScheduler
+from counter.stages import FrameStages
+
+STAGES = ('capture', 'inference', 'postprocess', 'drawing', 'display')
+
+
+def summarize(samples):
+    """Latency summary in milliseconds for a list of durations in seconds."""
+    ms = np.asarray(samples, dtype=np.float64) * 1000.0
+    if len(ms) == 0:
+        return {'count': 0}
+    p50, p95, p99 = np.percentile(ms, [50, 95, 99])
+    return {'count': len(ms), 'mean_ms': round(float(ms.mean()), 4), 'p50_ms': round(float(p50), 4),
+            'p95_ms': round(float(p95), 4), 'p99_ms': round(float(p99), 4), 'max_ms': round(float(ms.max()), 4)}
+
+
+def run_benchmark(cap, model, catalog, frames, warmup=20, min_thresh=0.5, scheduler=None, hud=False,
+                  record_path=None, display=False):
+    """Time each stage of the counter loop for up to frames frames. Returns the report dict.
+
+    Frames go through counter.stages.FrameStages, the same inference, post-processing and drawing code
+    medecine_info_counter.py runs, and stages are timed by its Metrics stage timers.
+    """
+    metrics = Metrics(window=max(frames, 1))
+    stages = FrameStages(model, catalog, min_thresh, metrics=metrics, scheduler=scheduler, hud=hud)
+    cap = TimedCapture(cap, metrics)
+    recorder = None
+    totals = []
+    detections_kept = 0
+
+    frame_count = 0
+    start = time.perf_counter() if warmup == 0 else None
+    warmup_counts = dict(stages.scheduler.counts)
+    while frame_count < warmup + frames:
+        t0 = time.perf_counter()
+        ret, frame = cap.read()
+        if not ret or frame is None:
+            break
+        detections = stages.infer(frame)
+        frame = stages.annotate(frame, detections)
+        with metrics.stage('display'):
+            if record_path is not None:
+                if recorder is None:
+                    recorder = cv2.VideoWriter(record_path, cv2.VideoWriter_fourcc(*'MJPG'), 30, frame.shape[1::-1])
+                recorder.write(frame)
+            if display:
+                cv2.imshow('Benchmark', frame)
+                cv2.waitKey(1)
+        t1 = time.perf_counter()
+
+        frame_count += 1
+        if frame_count <= warmup:
+            if frame_count == warmup:
+                metrics.reset()
+                warmup_counts = dict(stages.scheduler.counts)
+                start = time.perf_counter()
+            continue
+        totals.append(t1 - t0)
+        detections_kept += len(detections)
+
+    elapsed = time.perf_counter() - start if start is not None else 0.0
+    if recorder is not None:
+        recorder.release()
+    measured = len(totals)
+    stage_samples = {}
+    for stage in STAGES:
+        stats = metrics.stages.get(stage)
+        stage_samples[stage] = stats.window[:stats.filled] if stats is not None else []
+    return {
+        'frames': measured,
+        'fps': round(measured / elapsed, 2) if elapsed > 0 else 0.0,
+        'detections_per_frame': round(detections_kept / measured, 2) if measured else 0.0,
+        'scheduler': {kind: count - warmup_counts[kind] for kind, count in stages.scheduler.counts.items()},
+        'overlay_cache': {'hits': stages.overlay_cache.hits, 'misses': stages.overlay_cache.misses},
+        'stages': {stage: summarize(samples) for stage, samples in stage_samples.items()},
+        'total': summarize(totals),
+    }
+
+
+def main():
+    # Define and parse user input arguments
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--frames', help='Number of frames to measure', type=int, default=300)
+    parser.add_argument('--warmup', help='Frames to run before measuring', type=int, default=20)
+    parser.add_argument('--resolution', help='Frame size in WxH (example: "1024x600")', default='1024x600')
+    parser.add_argument('--video', help='Replay this video file (looped) instead of synthetic frames', default=None)
+    parser.add_argument('--boxes', help='Boxes returned by the stub detector per frame', type=int, default=10)
+    parser.add_argument('--classes', help='Number of distinct classes the stub detector returns', type=int, default=5)
+    parser.add_argument('--inference_ms', help='Simulated forward pass time of the stub detector', type=float,
+                        default=0.0)
+    parser.add_argument('--thresh', help='Minimum confidence threshold', type=float, default=0.5)
+    parser.add_argument('--catalog', help='Brand catalog used for class names and info panels',
+                        default='brand_catalog.json')
+    parser.add_argument('--detect_every', help='Run the detector every N frames and carry boxes forward in between',
+                        type=int, default=1)
+    parser.add_argument('--adaptive', help='Use the adaptive scheduler (motion gate and latency budget)',
+                        action='store_true')
+    parser.add_argument('--hud', help='Also time drawing the FPS/latency HUD', action='store_true')
+    parser.add_argument('--seed', help='Seed for synthetic frames and stub detections', type=int, default=0)
+    parser.add_argument('--record', help='Also time writing frames to an MJPG video', action='store_true')
+    parser.add_argument('--display', help='Also time cv2.imshow (needs a display)', action='store_true')
+    parser.add_argument('--output', help='Write the JSON report to this file as well as stdout', default=None)
+    args = parser.parse_args()
+
+    width, height = [int(v) for v in args.resolution.lower().split('x')]
+    if not os.path.exists(args.catalog):
+        print(f'Catalog {args.catalog} not found. Run the benchmark from the repository root or pass --catalog.')
+        sys.exit(0)
+
+    # Use the catalog's brand names as the stub model's labels so info panels have real text to render
+    with open(args.catalog, 'r', encoding='utf-8') as f:
+        names = list(json.load(f))
+    model = StubModel(names, num_boxes=args.boxes, num_classes=args.classes, delay_ms=args.inference_ms,
+                      seed=args.seed)
+    catalog = Catalog(args.catalog, model.names)
+
+    total_frames = args.warmup + args.frames
+    if args.video:
+        cap = ReplayCapture(args.video, frames=total_frames, width=width, height=height)
+    else:
+        cap = SyntheticCapture(width, height, frames=total_frames, seed=args.seed)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        record_path = os.path.join(tmp_dir, 'bench.avi') if args.record else None
+        scheduler = AdaptiveScheduler(detect_every=args.detect_every, adaptive=args.adaptive)
+        report = run_benchmark(cap, model, catalog, args.frames, warmup=args.warmup, min_thresh=args.thresh,
+                               scheduler=scheduler, hud=args.hud, record_path=record_path, display=args.display)
+    cap.release()
+
+    report['config'] = vars(args)
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text + '\n')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,140 @@
+##### Benchmark stand-ins for the camera and the model #####
+
+# Description:
+# Frame sources that replace cv2.VideoCapture and a deterministic stub detector that replaces the
+# trained YOLO model, so the counter loop can be benchmarked headless without a camera, GPU or weights.
+
+import time
+
+import cv2
+import numpy as np
+
+
+class SyntheticCapture:
+    """cv2.VideoCapture stand-in that returns generated frames.
+
+    A small pool of noise frames is generated up front and copied out on each read(), which costs about
+    what handing over a decoded camera buffer costs. frames=None never runs out.
+    """
+
+    def __init__(self, width=1024, height=600, frames=None, seed=0, pool_size=8):
+        rng = np.random.default_rng(seed)
+        self.pool = [rng.integers(0, 256, (height, width, 3), dtype=np.uint8) for _ in range(pool_size)]
+        self.frames = frames
+        self.index = 0
+
+    def read(self):
+        if self.frames is not None and self.index >= self.frames:
+            return False, None
+        frame = self.pool[self.index % len(self.pool)].copy()
+        self.index += 1
+        return True, frame
+
+    def set(self, prop, value):
+        return False
+
+    def release(self):
+        pass
+
+
+class ReplayCapture:
+    """cv2.VideoCapture stand-in that replays a video file, looping it until frames frames were read."""
+
+    def __init__(self, path, frames=None, width=None, height=None):
+        self.cap = cv2.VideoCapture(path)
+        if not self.cap.isOpened():
+            raise OSError(f'Could not open video {path}')
+        self.path = path
+        self.frames = frames
+        self.size = (width, height) if width and height else None
+        self.index = 0
+
+    def read(self):
+        if self.frames is not None and self.index >= self.frames:
+            return False, None
+        ret, frame = self.cap.read()
+        if not ret:
+            # Start over at the end of the file
+            self.cap.release()
+            self.cap = cv2.VideoCapture(self.path)
+            ret, frame = self.cap.read()
+            if not ret:
+                return False, None
+        if self.size is not None and frame.shape[1::-1] != self.size:
+            frame = cv2.resize(frame, self.size)
+        self.index += 1
+        return True, frame
+
+    def set(self, prop, value):
+        return False
+
+    def release(self):
+        self.cap.release()
+
+
+class StubBoxes:
+    """Minimal stand-in for ultralytics.engine.results.Boxes backed by a NumPy array."""
+
+    def __init__(self, data, is_track):
+        self.data = data
+        self.is_track = is_track
+
+    def __len__(self):
+        return len(self.data)
+
+    def cpu(self):
+        return self
+
+    def numpy(self):
+        return self
+
+
+class StubResult:
+    def __init__(self, boxes):
+        self.boxes = boxes
+
+
+class StubModel:
+    """Deterministic detector stand-in with the parts of the YOLO API the counter uses.
+
+    Every call returns num_boxes boxes per frame spread over num_classes classes. Box positions,
+    classes and confidences depend only on seed and the call index, so runs are repeatable. delay_ms
+    simulates the cost of a forward pass (per frame, so batched calls scale with batch size).
+    """
+
+    def __init__(self, names, num_boxes=10, num_classes=None, delay_ms=0.0, seed=0):
+        self.names = dict(enumerate(names)) if not isinstance(names, dict) else names
+        self.num_boxes = num_boxes
+        self.num_classes = min(num_classes or len(self.names), len(self.names))
+        self.delay = delay_ms / 1000.0
+        self.seed = seed
+        self.calls = 0
+
+    def _detect(self, frame, tracked):
+        rng = np.random.default_rng((self.seed, self.calls))
+        self.calls += 1
+        h, w = frame.shape[:2]
+        n = self.num_boxes
+        x1 = rng.uniform(0, w * 0.8, n)
+        y1 = rng.uniform(0, h * 0.8, n)
+        # Boxes are 20 px to a fifth of the frame in size (clamped so frames under 100 px still work)
+        x2 = np.minimum(x1 + rng.uniform(20, max(21, w * 0.2), n), w - 1)
+        y2 = np.minimum(y1 + rng.uniform(20, max(21, h * 0.2), n), h - 1)
+        conf = rng.uniform(0.3, 1.0, n)
+        cls = rng.integers(0, self.num_classes, n)
+        columns = [x1, y1, x2, y2] + ([np.arange(1, n + 1)] if tracked else []) + [conf, cls]
+        return StubResult(StubBoxes(np.stack(columns, axis=1).astype(np.float32), tracked))
+
+    def _run(self, source, tracked):
+        frames = source if isinstance(source, list) else [source]
+        if self.delay:
+            time.sleep(self.delay * len(frames))
+        return [self._detect(frame, tracked) for frame in frames]
+
+    def track(self, source, **kwargs):
+        return self._run(source, tracked=True)
+
+    def predict(self, source, **kwargs):
+        return self._run(source, tracked=False)
+
+    __call__ = predict
@@ -0,0 +1 @@
+# Helper modules for medecine_info_counter.py
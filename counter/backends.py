@@ -0,0 +1,72 @@
+##### Inference backends #####
+
+# Description:
+# Picks the runtime that executes the model: PyTorch (.pt), ONNX Runtime (.onnx) or OpenVINO (an
+# "_openvino_model" export folder). Ultralytics' YOLO class exposes the same predict()/track() API for
+# all of them, so the rest of the counter loop doesn't change. Exported files are located next to the
+# trained weights using the names utils/export_model.py writes, e.g. for my_model.pt:
+#   onnx:      my_model.onnx           (my_model_int8.onnx with int8=True)
+#   openvino:  my_model_openvino_model/ (my_model_int8_openvino_model/ with int8=True)
+
+import importlib.util
+import os
+
+BACKENDS = ('auto', 'pytorch', 'onnx', 'openvino')
+
+# Python package each backend needs at runtime
+_RUNTIME_PACKAGES = {'pytorch': 'torch', 'onnx': 'onnxruntime', 'openvino': 'openvino'}
+
+
+def detect_backend(model_path):
+    """Infer the backend from a model file or folder name."""
+    path = model_path.rstrip('/\\')
+    if path.endswith('_openvino_model'):
+        return 'openvino'
+    if path.lower().endswith('.onnx'):
+        return 'onnx'
+    return 'pytorch'
+
+
+def model_stem(model_path):
+    """Base name shared by the weights and their exports ("my_model" for "models/my_model_int8.onnx")."""
+    path = model_path.rstrip('/\\')
+    for suffix in ('_openvino_model', '.onnx', '.pt'):
+        if path.lower().endswith(suffix):
+            path = path[:-len(suffix)]
+            break
+    if path.endswith('_int8'):
+        path = path[:-len('_int8')]
+    return path
+
+
+def resolve_model_path(model_path, backend='auto', int8=False):
+    """Path of the model file/folder to load for backend, derived from model_path if needed."""
+    if backend == 'auto':
+        if not int8:
+            return model_path
+        backend = detect_backend(model_path)
+    stem = model_stem(model_path) + ('_int8' if int8 else '')
+    if backend == 'onnx':
+        return stem + '.onnx'
+    if backend == 'openvino':
+        return stem + '_openvino_model'
+    if int8:
+        raise ValueError('INT8 weights are only available for the onnx and openvino backends.')
+    return stem + '.pt'
+
+
+def load_model(model_path, backend='auto', int8=False):
+    """Load a YOLO model on the requested backend. Returns (model, resolved_path, backend)."""
+    if backend not in BACKENDS:
+        raise ValueError(f'Unknown backend "{backend}". Choose one of {BACKENDS}.')
+    path = resolve_model_path(model_path, backend, int8)
+    backend = detect_backend(path)
+    if not os.path.exists(path):
+        hint = ' Create it with utils/export_model.py.' if backend != 'pytorch' else ''
+        raise FileNotFoundError(f'Model {path} for the {backend} backend was not found.{hint}')
+    package = _RUNTIME_PACKAGES[backend]
+    if importlib.util.find_spec(package) is None:
+        raise ImportError(f'The {backend} backend needs the "{package}" package. Install it with "pip install {package}".')
+
+    from ultralytics import YOLO
+    return YOLO(path, task='detect'), path, backend
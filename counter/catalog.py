@@ -0,0 +1,140 @@
+##### Brand catalog #####
+
+# Description:
+# Loads brand information from an external JSON file, validates it against the model's class names and
+# compiles it into a list indexed by class id, so the per-frame lookup is plain integer indexing. The
+# file is watched for changes and hot-reloaded; a broken edit is reported and the last good catalog is
+# kept, so a typo in the catalog can never crash the camera loop.
+#
+# The catalog file maps each brand name (as it appears in the model's labels) to its fields:
+#   {"Biogesic": {"generic_name": "Paracetamol", "dosage": "500 mg Tablet", "uses": "...", "instructions": "..."}}
+
+import json
+import os
+import threading
+import time
+
+# Catalog fields and the titles they are displayed with, in display order
+FIELDS = {
+    'generic_name': 'Generic Name',
+    'dosage': 'Dosage',
+    'uses': 'Uses',
+    'instructions': 'Instructions',
+}
+
+
+class CatalogError(Exception):
+    """Raised when a catalog file cannot be read or does not match the expected format."""
+
+
+def load_catalog_file(path):
+    """Read and validate a catalog file. Returns {brand_name: {field: value}}.
+
+    All problems in the file are collected and raised together in one CatalogError.
+    """
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except (OSError, ValueError) as e:
+        raise CatalogError(f'Could not read catalog {path}: {e}') from e
+    if not isinstance(data, dict):
+        raise CatalogError(f'Catalog {path} must be a JSON object mapping brand names to their info.')
+
+    errors = []
+    brands = {}
+    for brand_name, entry in data.items():
+        if not isinstance(entry, dict):
+            errors.append(f'"{brand_name}": expected an object with fields {list(FIELDS)}')
+            continue
+        unknown = set(entry) - set(FIELDS)
+        if unknown:
+            errors.append(f'"{brand_name}": unknown fields {sorted(unknown)}')
+        bad_types = [field for field, value in entry.items() if not isinstance(value, str)]
+        if bad_types:
+            errors.append(f'"{brand_name}": fields {sorted(bad_types)} must be strings')
+        if not unknown and not bad_types:
+            brands[brand_name] = {field: entry.get(field, '') for field in FIELDS}
+    if errors:
+        raise CatalogError(f'Invalid catalog {path}:\n  ' + '\n  '.join(errors))
+    return brands
+
+
+def compile_catalog(brands, class_names):
+    """Compile brand info into a list indexed by class id.
+
+    class_names is the model's label map ({class_id: name}, as in model.names). Each list element is a
+    tuple of (title, value) pairs ready for display (empty fields are left out), or None for classes
+    without catalog info.
+    Returns (entries, info, warnings), where info holds the raw {field: value} dict of each class.
+    """
+    num_classes = max(class_names) + 1 if class_names else 0
+    entries = [None] * num_classes
+    info_by_id = [None] * num_classes
+    for class_id, name in class_names.items():
+        info = brands.get(name)
+        if info is not None:
+            info_by_id[class_id] = info
+            entries[class_id] = (('Brand', name),) + tuple((title, info[field]) for field, title in FIELDS.items()
+                                                           if info[field])
+
+    warnings = []
+    known = set(class_names.values())
+    unused = [name for name in brands if name not in known]
+    if unused:
+        warnings.append(f'Catalog entries not in the model labels (ignored): {", ".join(unused)}')
+    missing = [name for name in class_names.values() if name not in brands]
+    if missing:
+        warnings.append(f'Model classes without catalog info: {", ".join(missing)}')
+    return entries, info_by_id, warnings
+
+
+class Catalog:
+    """Brand info indexed by model class id, hot-reloaded when the catalog file changes.
+
+    catalog[class_id] returns the compiled display entry for that class, or None. catalog.info[class_id]
+    holds the raw {field: value} dict for exporting.
+    """
+
+    def __init__(self, path, class_names, poll_interval=1.0):
+        self.path = path
+        self.class_names = dict(class_names)
+        self.poll_interval = poll_interval
+        self._lock = threading.Lock()
+        self._next_poll = 0.0
+        self._mtime = os.stat(path).st_mtime_ns
+        brands = load_catalog_file(path)
+        self.entries, self.info, self.warnings = compile_catalog(brands, self.class_names)
+
+    def __getitem__(self, class_id):
+        entries = self.entries
+        if 0 <= class_id < len(entries):
+            return entries[class_id]
+        return None
+
+    def maybe_reload(self):
+        """Reload the catalog if its file changed. Returns True if new entries were swapped in.
+
+        The file is stat'ed at most once per poll_interval, so this is cheap to call every frame.
+        """
+        now = time.monotonic()
+        if now < self._next_poll:
+            return False
+        with self._lock:
+            self._next_poll = now + self.poll_interval
+            try:
+                mtime = os.stat(self.path).st_mtime_ns
+            except OSError:
+                return False
+            if mtime == self._mtime:
+                return False
+            self._mtime = mtime
+            try:
+                brands = load_catalog_file(self.path)
+            except CatalogError as e:
+                print(f'WARNING: {e}\nKeeping the previously loaded catalog.')
+                return False
+            self.entries, self.info, self.warnings = compile_catalog(brands, self.class_names)
+        for warning in self.warnings:
+            print(f'WARNING: {warning}')
+        print(f'Reloaded brand catalog from {self.path}.')
+        return True
@@ -0,0 +1,66 @@
+##### Batched detection post-processing #####
+
+# Description:
+# Converts an Ultralytics Boxes object into a compact batch of NumPy arrays with a single
+# device-to-host transfer, and applies the confidence threshold with a vectorized mask instead of
+# inspecting each box in Python.
+
+import numpy as np
+
+
+class DetectionBatch:
+    """Detections of one frame that passed the confidence threshold.
+
+    xyxy  -- (N, 4) int32 box corners in pixels
+    cls   -- (N,) int32 class ids
+    conf  -- (N,) float32 confidences
+    ids   -- (N,) int32 tracker ids, -1 when the box is not tracked
+    """
+
+    __slots__ = ('xyxy', 'cls', 'conf', 'ids')
+
+    def __init__(self, xyxy, cls, conf, ids):
+        self.xyxy = xyxy
+        self.cls = cls
+        self.conf = conf
+        self.ids = ids
+
+    def __len__(self):
+        return len(self.cls)
+
+    def __iter__(self):
+        # Plain Python ints/floats so drawing code doesn't touch NumPy scalars per box
+        return zip(self.xyxy.tolist(), self.cls.tolist(), self.conf.tolist(), self.ids.tolist())
+
+    @classmethod
+    def empty(cls):
+        return cls(np.empty((0, 4), np.int32), np.empty(0, np.int32), np.empty(0, np.float32),
+                   np.empty(0, np.int32))
+
+    @classmethod
+    def from_array(cls, data, min_thresh=0.0, tracked=None):
+        """Build a batch from an (N, 6) [x1, y1, x2, y2, conf, cls] or (N, 7) [..., id, conf, cls] array."""
+        data = np.asarray(data, dtype=np.float32)
+        if data.ndim != 2 or len(data) == 0:
+            return cls.empty()
+        if tracked is None:
+            tracked = data.shape[1] == 7
+        keep = data[:, -2] > min_thresh
+        data = data[keep]
+        ids = data[:, 4].astype(np.int32) if tracked else np.full(len(data), -1, np.int32)
+        return cls(data[:, :4].astype(np.int32), data[:, -1].astype(np.int32), data[:, -2].copy(), ids)
+
+    @classmethod
+    def from_boxes(cls, boxes, min_thresh=0.0):
+        """Build a batch from an Ultralytics Boxes object in one device-to-host copy."""
+        if boxes is None or len(boxes) == 0:
+            return cls.empty()
+        data = boxes.data
+        if hasattr(data, 'cpu'):
+            data = data.cpu().numpy()
+        return cls.from_array(data, min_thresh, tracked=bool(boxes.is_track))
+
+    def class_ids(self):
+        """Distinct class ids in this batch, in order of first appearance."""
+        _, first = np.unique(self.cls, return_index=True)
+        return self.cls[np.sort(first)].tolist()
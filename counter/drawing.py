@@ -0,0 +1,37 @@
+##### Drawing detections #####
+
+# Description:
+# Draws bounding boxes, cached label sprites and the brand info panels for one frame's detections.
+
+import cv2
+
+from counter.overlay import blit
+
+# Bounding box colors (using the Tableau 10 color scheme)
+BBOX_COLORS = [(164, 120, 87), (68, 148, 228), (93, 97, 209), (178, 182, 133),
+               (88, 159, 106), (96, 202, 231), (159, 124, 168), (169, 162, 241),
+               (98, 118, 150), (172, 176, 184)]
+
+
+def draw_detections(frame, detections, labels, overlay_cache, colors=BBOX_COLORS):
+    """Draw a DetectionBatch onto frame in place and return the frame."""
+    # Go through each detection and draw its bbox and label
+    for (xmin, ymin, xmax, ymax), classidx, conf, track_id in detections:
+        classname = labels[classidx]
+
+        # Draw box around object
+        color = colors[classidx % len(colors)]
+        cv2.rectangle(frame, (xmin, ymin), (xmax, ymax), color, 2)
+
+        # Draw label for object from the cached sprite
+        label = overlay_cache.label(classname, conf, color)
+        label_ymin = max(ymin, label.shape[0] + 10)
+        blit(frame, label, xmin, label_ymin - label.shape[0] - 10)
+
+    # Display information about the detected brands, stacking each brand's cached panel until the frame is full
+    y = 25
+    for patch, alpha in overlay_cache.panels(detections.class_ids(), max_height=frame.shape[0] - y):
+        blit(frame, patch, 10, y, alpha)
+        y += patch.shape[0]
+
+    return frame
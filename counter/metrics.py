@@ -0,0 +1,211 @@
+##### Runtime metrics #####
+
+# Description:
+# Low-overhead instrumentation for the counter loop. Each stage (camera read, inference,
+# post-processing, drawing, display/record) is timed with perf_counter into a rolling window for live
+# percentiles and into cumulative histogram buckets for Prometheus. Metrics can be drawn as a HUD on the
+# frame and served as Prometheus text from a local HTTP endpoint. When metrics are disabled,
+# stage() hands back a shared no-op context manager, so the loop pays almost nothing.
+
+import bisect
+import contextlib
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import cv2
+import numpy as np
+
+# Upper bounds (seconds) of the Prometheus histogram buckets
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.075, 0.1, 0.15, 0.25, 0.5, 1.0, 2.5)
+
+_NULL_STAGE = contextlib.nullcontext()
+
+
+class StageStats:
+    """Durations of one stage: a rolling window for percentiles plus cumulative histogram buckets."""
+
+    def __init__(self, window=512):
+        self.window = np.zeros(window, np.float64)
+        self.filled = 0
+        self.pos = 0
+        self.bucket_counts = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.lock = threading.Lock()
+
+    def observe(self, seconds):
+        with self.lock:
+            self.window[self.pos] = seconds
+            self.pos = (self.pos + 1) % len(self.window)
+            self.filled = min(self.filled + 1, len(self.window))
+            self.bucket_counts[bisect.bisect_left(BUCKETS, seconds)] += 1
+            self.count += 1
+            self.total += seconds
+
+    def percentiles(self, qs=(50, 95, 99)):
+        """Percentiles (seconds) over the rolling window, or None if nothing was observed yet."""
+        with self.lock:
+            if not self.filled:
+                return None
+            return np.percentile(self.window[:self.filled], qs)
+
+
+class _StageTimer:
+    __slots__ = ('stats', 'start')
+
+    def __init__(self, stats):
+        self.stats = stats
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.stats.observe(time.perf_counter() - self.start)
+
+
+class Metrics:
+    """Stage timers and counters for the counter loop. With enabled=False every call is a no-op."""
+
+    def __init__(self, enabled=True, window=512):
+        self.enabled = enabled
+        self.window = window
+        self.stages = {}
+        self.frames = 0
+        self.dropped_frames = 0
+        self.detections = 0
+        self.detections_total = 0
+        self._frame_times = np.zeros(64, np.float64)
+        self._lock = threading.Lock()
+
+    def reset(self):
+        """Forget all stage timings and counters, e.g. at the end of a warm-up."""
+        with self._lock:
+            self.stages = {}
+            self.frames = 0
+            self.dropped_frames = 0
+            self.detections = 0
+            self.detections_total = 0
+
+    def _stats(self, name):
+        stats = self.stages.get(name)
+        if stats is None:
+            with self._lock:
+                stats = self.stages.setdefault(name, StageStats(self.window))
+        return stats
+
+    def stage(self, name):
+        """Context manager that times the enclosed block as stage name."""
+        if not self.enabled:
+            return _NULL_STAGE
+        return _StageTimer(self._stats(name))
+
+    def frame_done(self, detections=0):
+        """Count a finished frame and its number of detections. Set dropped_frames directly."""
+        if not self.enabled:
+            return
+        with self._lock:
+            self._frame_times[self.frames % len(self._frame_times)] = time.perf_counter()
+            self.frames += 1
+            self.detections = detections
+            self.detections_total += detections
+
+    def fps(self):
+        """Frame rate over the last (up to) 64 frames."""
+        with self._lock:
+            n = min(self.frames, len(self._frame_times))
+            if n < 2:
+                return 0.0
+            newest = self._frame_times[(self.frames - 1) % len(self._frame_times)]
+            oldest = self._frame_times[(self.frames - n) % len(self._frame_times)]
+        return (n - 1) / (newest - oldest) if newest > oldest else 0.0
+
+    def prometheus(self, prefix='counter'):
+        """Render all metrics in the Prometheus text exposition format."""
+        lines = [
+            f'# HELP {prefix}_stage_seconds Time spent in each stage of the frame loop.',
+            f'# TYPE {prefix}_stage_seconds histogram',
+        ]
+        for name, stats in list(self.stages.items()):
+            with stats.lock:
+                counts, count, total = list(stats.bucket_counts), stats.count, stats.total
+            cumulative = 0
+            for bound, bucket_count in zip(BUCKETS, counts):
+                cumulative += bucket_count
+                lines.append(f'{prefix}_stage_seconds_bucket{{stage="{name}",le="{bound}"}} {cumulative}')
+            lines.append(f'{prefix}_stage_seconds_bucket{{stage="{name}",le="+Inf"}} {count}')
+            lines.append(f'{prefix}_stage_seconds_sum{{stage="{name}"}} {total:.6f}')
+            lines.append(f'{prefix}_stage_seconds_count{{stage="{name}"}} {count}')
+        lines += [
+            f'# HELP {prefix}_frames_total Frames processed.',
+            f'# TYPE {prefix}_frames_total counter',
+            f'{prefix}_frames_total {self.frames}',
+            f'# HELP {prefix}_dropped_frames_total Frames dropped to keep latency bounded.',
+            f'# TYPE {prefix}_dropped_frames_total counter',
+            f'{prefix}_dropped_frames_total {self.dropped_frames}',
+            f'# HELP {prefix}_detections_total Detections above the confidence threshold.',
+            f'# TYPE {prefix}_detections_total counter',
+            f'{prefix}_detections_total {self.detections_total}',
+            f'# HELP {prefix}_detections Detections above the confidence threshold in the last frame.',
+            f'# TYPE {prefix}_detections gauge',
+            f'{prefix}_detections {self.detections}',
+            f'# HELP {prefix}_fps Frame rate over the last 64 frames.',
+            f'# TYPE {prefix}_fps gauge',
+            f'{prefix}_fps {self.fps():.3f}',
+        ]
+        return '\n'.join(lines) + '\n'
+
+
+class TimedCapture:
+    """Wraps a cv2.VideoCapture so every read() is timed as the 'capture' stage."""
+
+    def __init__(self, cap, metrics):
+        self.cap = cap
+        self.metrics = metrics
+
+    def read(self):
+        with self.metrics.stage('capture'):
+            return self.cap.read()
+
+    def __getattr__(self, name):
+        return getattr(self.cap, name)
+
+
+def draw_hud(frame, metrics, stages=('capture', 'inference', 'postprocess', 'drawing', 'display')):
+    """Draw FPS, per-stage p50/p95 and drop/detection counts in the bottom-left corner of frame."""
+    lines = [f'FPS: {metrics.fps():.1f}  Dets: {metrics.detections}  Dropped: {metrics.dropped_frames}']
+    for name in stages:
+        stats = metrics.stages.get(name)
+        pcts = stats.percentiles((50, 95)) if stats is not None else None
+        if pcts is not None:
+            lines.append(f'{name}: p50 {pcts[0] * 1000:.1f} ms  p95 {pcts[1] * 1000:.1f} ms')
+    y = frame.shape[0] - 10 - 18 * (len(lines) - 1)
+    for line in lines:
+        cv2.putText(frame, line, (10, y), cv2.FONT_HERSHEY_SIMPLEX, 0.45, (0, 0, 0), 3)
+        cv2.putText(frame, line, (10, y), cv2.FONT_HERSHEY_SIMPLEX, 0.45, (0, 255, 255), 1)
+        y += 18
+    return frame
+
+
+def start_http_server(metrics, port=9100, host='127.0.0.1'):
+    """Serve metrics.prometheus() at http://host:port/metrics from a daemon thread. Returns the server."""
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split('?')[0] not in ('/metrics', '/'):
+                self.send_error(404)
+                return
+            body = metrics.prometheus().encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):  # Keep scrapes out of the console
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=server.serve_forever, name='metrics-http', daemon=True).start()
+    return server
@@ -0,0 +1,113 @@
+##### Multi-camera serving #####
+
+# Description:
+# Serves several cameras or streams from one process and one model. Every stream has its own capture
+# thread that keeps only its latest frame. Each tick, the latest frames of all streams are gathered into
+# a single batched model call, and each stream's detections are passed through that stream's own
+# tracker so track IDs stay independent between cameras.
+
+import inspect
+import threading
+import time
+
+from counter.pipeline import CaptureThread, FrameQueue
+
+
+def make_tracker(tracker_cfg='bytetrack.yaml', frame_rate=30):
+    """Create a standalone Ultralytics BYTETracker/BOTSORT tracker from a tracker config file."""
+    from ultralytics.trackers.bot_sort import BOTSORT
+    from ultralytics.trackers.byte_tracker import BYTETracker
+    from ultralytics.utils import IterableSimpleNamespace
+    from ultralytics.utils.checks import check_yaml
+    try:
+        from ultralytics.utils import YAML
+        cfg = YAML.load(check_yaml(tracker_cfg))
+    except ImportError:  # Older Ultralytics releases
+        from ultralytics.utils import yaml_load
+        cfg = yaml_load(check_yaml(tracker_cfg))
+    cfg = IterableSimpleNamespace(**cfg)
+    tracker_class = BOTSORT if cfg.tracker_type == 'botsort' else BYTETracker
+    # Older releases take the frame rate as a separate argument; newer ones only take the config
+    if 'frame_rate' in inspect.signature(tracker_class.__init__).parameters:
+        return tracker_class(cfg, frame_rate=frame_rate)
+    return tracker_class(cfg)
+
+
+def apply_tracker(tracker, result, frame):
+    """Update tracker with one frame's detections and return the result with track IDs attached.
+
+    Mirrors what model.track() does internally, but with a tracker owned by the caller.
+    """
+    tracks = tracker.update(result.boxes.cpu().numpy(), frame)
+    if len(tracks) == 0:
+        return result
+    idx = tracks[:, -1].astype(int)
+    result = result[idx]
+    result.update(boxes=tracks[:, :-1])
+    return result
+
+
+class MultiStream:
+    """Capture threads for several streams feeding one batched predict() call per tick.
+
+    predict(frames) must run the model on a list of frames and return one result per frame. Iterating
+    yields, for every tick, a list of (stream_index, frame, result) for the streams that had a new
+    frame. Iteration ends once every stream has stopped delivering frames.
+    """
+
+    def __init__(self, caps, predict, track=True, tracker_cfg='bytetrack.yaml'):
+        self.predict = predict
+        self.stop_event = threading.Event()
+        self.queues = [FrameQueue(1, drop='latest') for _ in caps]
+        self.captures = [CaptureThread(cap, queue, self.stop_event) for cap, queue in zip(caps, self.queues)]
+        self.trackers = [make_tracker(tracker_cfg) for _ in caps] if track else None
+        self.ticks = 0
+
+    @property
+    def dropped(self):
+        return sum(queue.dropped for queue in self.queues)
+
+    def failed_streams(self):
+        return [i for i, capture in enumerate(self.captures) if capture.failed]
+
+    def start(self):
+        for capture in self.captures:
+            capture.start()
+        return self
+
+    def stop(self):
+        self.stop_event.set()
+        for queue in self.queues:
+            queue.close()
+        for capture in self.captures:
+            capture.join(timeout=5)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def __iter__(self):
+        while not self.stop_event.is_set():
+            # Gather the latest frame of every stream that has one
+            batch = []
+            for i, queue in enumerate(self.queues):
+                packet = queue.get(timeout=0)
+                if packet is not None:
+                    batch.append((i, packet[2]))
+            if not batch:
+                if all(queue.drained() for queue in self.queues):
+                    return
+                time.sleep(0.002)
+                continue
+
+            # One forward pass for all streams, then per-stream tracking
+            results = self.predict([frame for _, frame in batch])
+            tick = []
+            for (i, frame), result in zip(batch, results):
+                if self.trackers is not None:
+                    result = apply_tracker(self.trackers[i], result, frame)
+                tick.append((i, frame, result))
+            self.ticks += 1
+            yield tick
@@ -0,0 +1,199 @@
+##### Headless offline processing #####
+
+# Description:
+# Runs the detector over recorded footage (video files, image folders or glob patterns) instead of a
+# live camera. Frames are decoded by a generator pipeline on a background thread, handed to the model in
+# batches, and per-frame detections plus brand metadata are written to a JSONL or Parquet file. Nothing
+# is drawn or displayed unless asked for, so throughput is bounded by the model.
+
+import glob
+import json
+import os
+import threading
+
+import cv2
+
+from counter.detections import DetectionBatch
+from counter.pipeline import FrameQueue
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp', '.webp')
+VIDEO_EXTENSIONS = ('.avi', '.mov', '.mp4', '.mkv', '.wmv', '.m4v', '.mpg', '.mpeg')
+
+
+def expand_sources(patterns):
+    """Expand video files, image/video folders and glob patterns into a sorted list of file paths."""
+    paths = []
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            matches = [os.path.join(pattern, name) for name in os.listdir(pattern)]
+        elif os.path.isfile(pattern):
+            matches = [pattern]
+        else:
+            matches = glob.glob(pattern, recursive=True)
+        paths.extend(sorted(path for path in matches
+                            if path.lower().endswith(IMAGE_EXTENSIONS + VIDEO_EXTENSIONS)))
+    return paths
+
+
+def read_frames(paths):
+    """Yield (source, frame_index, timestamp_s, frame) for every frame of every path.
+
+    Images count as a single frame at time 0. Unreadable files are reported and skipped.
+    """
+    for path in paths:
+        if path.lower().endswith(IMAGE_EXTENSIONS):
+            frame = cv2.imread(path)
+            if frame is None:
+                print(f'WARNING: Could not read image {path}, skipping it.')
+                continue
+            yield path, 0, 0.0, frame
+            continue
+
+        cap = cv2.VideoCapture(path)
+        if not cap.isOpened():
+            print(f'WARNING: Could not open video {path}, skipping it.')
+            continue
+        index = 0
+        while True:
+            ret, frame = cap.read()
+            if not ret or frame is None:
+                break
+            yield path, index, cap.get(cv2.CAP_PROP_POS_MSEC) / 1000.0, frame
+            index += 1
+        cap.release()
+
+
+def prefetch(iterable, depth=8):
+    """Run iterable on a background thread, keeping up to depth items decoded ahead of the consumer."""
+    items = FrameQueue(depth, drop='none')
+    errors = []
+
+    def produce():
+        try:
+            for item in iterable:
+                if not items.put(item):
+                    break
+        except Exception as e:
+            errors.append(e)
+        finally:
+            items.close()
+
+    thread = threading.Thread(target=produce, name='prefetch', daemon=True)
+    thread.start()
+    try:
+        while True:
+            item = items.get()
+            if item is None:
+                break
+            yield item
+    finally:
+        items.close()
+        thread.join()
+    if errors:
+        raise errors[0]
+
+
+def batched(iterable, size):
+    """Group an iterable into lists of up to size items."""
+    batch = []
+    for item in iterable:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def frame_record(source, index, timestamp, detections, labels, catalog):
+    """Build the output record for one frame."""
+    objects = []
+    for (xmin, ymin, xmax, ymax), classidx, conf, track_id in detections:
+        info = catalog.info[classidx] if classidx < len(catalog.info) else None
+        objects.append({
+            'class_id': classidx,
+            'name': labels[classidx],
+            'conf': round(conf, 4),
+            'box': [xmin, ymin, xmax, ymax],
+            'track_id': track_id,
+            'brand_info': info,
+        })
+    return {'source': source, 'frame': index, 'time_s': round(timestamp, 3), 'detections': objects}
+
+
+class JsonlWriter:
+    """Writes one JSON object per frame."""
+
+    def __init__(self, path):
+        self.file = open(path, 'w', encoding='utf-8')
+
+    def write(self, record):
+        self.file.write(json.dumps(record, ensure_ascii=False) + '\n')
+
+    def close(self):
+        self.file.close()
+
+
+class ParquetWriter:
+    """Writes frame records to a Parquet file in row groups of rows_per_group frames. Requires pyarrow."""
+
+    def __init__(self, path, rows_per_group=1024):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError as e:
+            raise RuntimeError('Writing Parquet output requires pyarrow. Install it with "pip install pyarrow" '
+                               'or write to a .jsonl file instead.') from e
+        self.pa = pa
+        brand_info = pa.struct([(field, pa.string()) for field in ('generic_name', 'dosage', 'uses', 'instructions')])
+        detection = pa.struct([('class_id', pa.int32()), ('name', pa.string()), ('conf', pa.float32()),
+                               ('box', pa.list_(pa.int32())), ('track_id', pa.int32()), ('brand_info', brand_info)])
+        self.schema = pa.schema([('source', pa.string()), ('frame', pa.int64()), ('time_s', pa.float64()),
+                                 ('detections', pa.list_(detection))])
+        self.writer = pq.ParquetWriter(path, self.schema)
+        self.rows_per_group = rows_per_group
+        self.rows = []
+
+    def write(self, record):
+        self.rows.append(record)
+        if len(self.rows) >= self.rows_per_group:
+            self.flush()
+
+    def flush(self):
+        if self.rows:
+            self.writer.write_table(self.pa.Table.from_pylist(self.rows, schema=self.schema))
+            self.rows = []
+
+    def close(self):
+        self.flush()
+        self.writer.close()
+
+
+def open_writer(path):
+    """Pick an output writer from the file extension (.parquet or .jsonl)."""
+    if path.lower().endswith('.parquet'):
+        return ParquetWriter(path)
+    return JsonlWriter(path)
+
+
+def run_offline(model, paths, output_path, labels, catalog, min_thresh=0.5, batch_size=8, prefetch_depth=32,
+                on_frame=None):
+    """Run batched inference over all frames of paths and write one record per frame to output_path.
+
+    on_frame(frame, result) is called for every frame if given (for example to draw and display it);
+    returning False from it stops processing early. Returns the number of frames processed.
+    """
+    writer = open_writer(output_path)
+    frames_done = 0
+    try:
+        for batch in batched(prefetch(read_frames(paths), prefetch_depth), batch_size):
+            results = model.predict([frame for _, _, _, frame in batch], conf=min_thresh, verbose=False)
+            for (source, index, timestamp, frame), result in zip(batch, results):
+                detections = DetectionBatch.from_boxes(result.boxes, min_thresh)
+                writer.write(frame_record(source, index, timestamp, detections, labels, catalog))
+                frames_done += 1
+                if on_frame is not None and on_frame(frame, result) is False:
+                    return frames_done
+    finally:
+        writer.close()
+    return frames_done
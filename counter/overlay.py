@@ -0,0 +1,160 @@
+##### Cached overlay rendering #####
+
+# Description:
+# Font rasterization with cv2.putText is one of the largest per-frame costs after inference. This module
+# renders each brand's info panel and each "class: confidence%" label once into an image patch (with
+# text wrapping) and keeps the patches in size-capped LRU caches: labels by count, panels by bytes.
+# Each frame then only pays for alpha-blitting the cached patches onto the image.
+
+from collections import OrderedDict
+
+import cv2
+import numpy as np
+
+FONT = cv2.FONT_HERSHEY_SIMPLEX
+
+
+def wrap_text(text, max_width, font_scale=0.5, thickness=1):
+    """Split text into lines that fit within max_width pixels when drawn with FONT."""
+    lines = []
+    line = ''
+    for word in text.split():
+        candidate = f'{line} {word}' if line else word
+        if line and cv2.getTextSize(candidate, FONT, font_scale, thickness)[0][0] > max_width:
+            lines.append(line)
+            line = word
+        else:
+            line = candidate
+    if line:
+        lines.append(line)
+    return lines or ['']
+
+
+def blit(frame, patch, x, y, alpha=None):
+    """Draw patch onto frame with its top-left corner at (x, y), clipped to the frame.
+
+    alpha is an optional (h, w) float32 mask in [0, 1]; without it the patch is copied as-is.
+    """
+    fh, fw = frame.shape[:2]
+    ph, pw = patch.shape[:2]
+    x0, y0 = max(x, 0), max(y, 0)
+    x1, y1 = min(x + pw, fw), min(y + ph, fh)
+    if x0 >= x1 or y0 >= y1:
+        return frame
+    src = patch[y0 - y:y1 - y, x0 - x:x1 - x]
+    if alpha is None:
+        frame[y0:y1, x0:x1] = src
+        return frame
+    a = np.ascontiguousarray(alpha[y0 - y:y1 - y, x0 - x:x1 - x])
+    frame[y0:y1, x0:x1] = cv2.blendLinear(frame[y0:y1, x0:x1], np.ascontiguousarray(src), 1.0 - a, a)
+    return frame
+
+
+class OverlayCache:
+    """LRU caches of pre-rendered label sprites and per-brand info panels.
+
+    describe(key) must return the (title, value) pairs to show in the info panel for a brand key (such
+    as a class id), or None if there is nothing to show. Call clear() whenever the data behind
+    describe() changes. Labels are capped at max_entries sprites, panels at max_panel_bytes of patch
+    and alpha mask data.
+    """
+
+    def __init__(self, describe, max_entries=512, panel_width=420, font_scale=0.5, panel_opacity=0.55,
+                 max_panel_bytes=32 * 1024 * 1024):
+        self.describe = describe
+        self.max_entries = max_entries
+        self.max_panel_bytes = max_panel_bytes
+        self.panel_width = panel_width
+        self.font_scale = font_scale
+        self.panel_opacity = panel_opacity
+        self._cache = OrderedDict()
+        self._panels = OrderedDict()  # brand -> (patch, alpha), or None for brands without info
+        self._panel_bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def clear(self):
+        self._cache.clear()
+        self._panels.clear()
+        self._panel_bytes = 0
+
+    def _lookup(self, key, build):
+        entry = self._cache.get(key)
+        if entry is not None:
+            self._cache.move_to_end(key)
+            self.hits += 1
+            return entry
+        self.misses += 1
+        entry = build()
+        self._cache[key] = entry
+        if len(self._cache) > self.max_entries:
+            self._cache.popitem(last=False)
+        return entry
+
+    def label(self, classname, conf, color):
+        """Opaque label sprite for a box. Confidence is bucketed to the whole percent that is displayed."""
+        pct = int(conf * 100)
+        return self._lookup(('label', classname, pct, color), lambda: self._build_label(f'{classname}: {pct}%', color))
+
+    def _build_label(self, text, color):
+        (tw, th), baseline = cv2.getTextSize(text, FONT, self.font_scale, 1)
+        patch = np.empty((th + baseline, tw, 3), np.uint8)
+        patch[:] = color
+        cv2.putText(patch, text, (0, th + 3), FONT, self.font_scale, (0, 0, 0), 1)
+        return patch
+
+    def panels(self, brands, max_height=None):
+        """(patch, alpha) info panels of the distinct brand keys in brands, to be stacked top to bottom.
+
+        Panels are ordered by brand key so the stack doesn't reshuffle as detections come and go, and
+        brands without info are skipped. Once the stacked height reaches max_height the remaining brands
+        are neither rendered nor returned.
+        """
+        panels = []
+        height = 0
+        for brand in sorted(set(brands)):
+            if max_height is not None and height >= max_height:
+                break
+            panel = self._panel(brand)
+            if panel is not None:
+                panels.append(panel)
+                height += panel[0].shape[0]
+        return panels
+
+    def _panel(self, brand):
+        if brand in self._panels:
+            self._panels.move_to_end(brand)
+            self.hits += 1
+            return self._panels[brand]
+        self.misses += 1
+        panel = self._build_panel(brand)
+        self._panels[brand] = panel
+        if panel is not None:
+            self._panel_bytes += panel[0].nbytes + panel[1].nbytes
+        # Evict least recently used panels, but always keep the one just built
+        while self._panel_bytes > self.max_panel_bytes and len(self._panels) > 1:
+            evicted = self._panels.popitem(last=False)[1]
+            if evicted is not None:
+                self._panel_bytes -= evicted[0].nbytes + evicted[1].nbytes
+        return panel
+
+    def _build_panel(self, brand):
+        fields = self.describe(brand)
+        if not fields:
+            return None
+        line_h = int(40 * self.font_scale)
+        pad = 6
+        text_w = self.panel_width - 2 * pad
+        lines = []
+        for field, value in fields:
+            lines.extend(wrap_text(f'{field}: {value}', text_w, self.font_scale))
+
+        height = len(lines) * line_h + 2 * pad
+        patch = np.zeros((height, self.panel_width, 3), np.uint8)
+        for i, line in enumerate(lines):
+            cv2.putText(patch, line, (pad, pad + (i + 1) * line_h - line_h // 4), FONT, self.font_scale,
+                        (255, 255, 255), 1, cv2.LINE_AA)
+
+        # Dark translucent background with fully opaque text on top
+        alpha = np.maximum(patch.max(axis=2).astype(np.float32) / 255.0, self.panel_opacity)
+        return patch, alpha
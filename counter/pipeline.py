@@ -0,0 +1,179 @@
+##### Threaded capture -> inference -> render pipeline #####
+
+# Description:
+# Runs camera capture and model inference on their own threads so that camera I/O, the model call
+# and drawing/display overlap instead of adding up. Stages are joined by small bounded queues. With
+# the 'latest' drop policy a full queue throws away its oldest frame, so when inference is slower than
+# the camera the display always shows the freshest result and latency stays bounded.
+
+import threading
+import time
+from collections import deque
+
+DROP_POLICIES = ('latest', 'none')
+
+
+class FrameQueue:
+    """Bounded hand-off queue between two pipeline stages.
+
+    drop='latest' makes put() discard the oldest queued item when the queue is full ("latest frame
+    wins"); drop='none' makes put() block until the consumer has made room.
+    """
+
+    def __init__(self, maxsize=1, drop='latest'):
+        if drop not in DROP_POLICIES:
+            raise ValueError(f'Unknown drop policy "{drop}". Choose one of {DROP_POLICIES}.')
+        self.maxsize = max(1, int(maxsize))
+        self.drop = drop
+        self.dropped = 0
+        self.closed = False
+        self._items = deque()
+        self._cond = threading.Condition()
+
+    def put(self, item):
+        """Queue an item. Returns False if the queue was closed and the item was discarded."""
+        with self._cond:
+            while len(self._items) >= self.maxsize and not self.closed:
+                if self.drop == 'latest':
+                    self._items.popleft()
+                    self.dropped += 1
+                else:
+                    self._cond.wait()
+            if self.closed:
+                return False
+            self._items.append(item)
+            self._cond.notify_all()
+            return True
+
+    def get(self, timeout=None):
+        """Return the next item, or None on timeout or once the queue is closed and drained."""
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._items or self.closed, timeout):
+                return None
+            if not self._items:
+                return None
+            item = self._items.popleft()
+            self._cond.notify_all()
+            return item
+
+    def close(self):
+        """Wake up all waiters. Items already queued can still be read with get()."""
+        with self._cond:
+            self.closed = True
+            self._cond.notify_all()
+
+    def drained(self):
+        with self._cond:
+            return self.closed and not self._items
+
+
+class CaptureThread(threading.Thread):
+    """Reads frames from a cv2.VideoCapture-like object and pushes (index, t_capture, frame)."""
+
+    def __init__(self, cap, out_queue, stop_event):
+        super().__init__(name='capture', daemon=True)
+        self.cap = cap
+        self.out_queue = out_queue
+        self.stop_event = stop_event
+        self.failed = False
+        self.frames_read = 0
+
+    def run(self):
+        try:
+            while not self.stop_event.is_set():
+                ret, frame = self.cap.read()
+                if frame is None or not ret:
+                    self.failed = True
+                    break
+                self.out_queue.put((self.frames_read, time.perf_counter(), frame))
+                self.frames_read += 1
+        finally:
+            self.out_queue.close()
+
+
+class InferenceThread(threading.Thread):
+    """Pulls captured frames, runs infer(frame) on them and pushes (index, t_capture, frame, results)."""
+
+    def __init__(self, infer, in_queue, out_queue, stop_event):
+        super().__init__(name='inference', daemon=True)
+        self.infer = infer
+        self.in_queue = in_queue
+        self.out_queue = out_queue
+        self.stop_event = stop_event
+        self.error = None
+
+    def run(self):
+        try:
+            while not self.stop_event.is_set():
+                packet = self.in_queue.get(timeout=0.1)
+                if packet is None:
+                    if self.in_queue.drained():
+                        break
+                    continue
+                index, t_capture, frame = packet
+                results = self.infer(frame)
+                self.out_queue.put((index, t_capture, frame, results))
+        except Exception as e:  # Surface worker errors on the main thread instead of hanging it
+            self.error = e
+        finally:
+            self.out_queue.close()
+
+
+class Pipeline:
+    """Capture and inference threads feeding a render loop that runs on the calling thread.
+
+    OpenCV's HighGUI functions (imshow/waitKey) must stay on the main thread, so the render stage is
+    whatever the caller does with each (frame, results) pair yielded by iterating the pipeline:
+
+        with Pipeline(cap, infer) as pipeline:
+            for frame, results in pipeline:
+                ...draw, cv2.imshow, cv2.waitKey...
+    """
+
+    def __init__(self, cap, infer, queue_size=1, drop='latest'):
+        self.stop_event = threading.Event()
+        self.capture_queue = FrameQueue(queue_size, drop)
+        self.result_queue = FrameQueue(queue_size, drop)
+        self.capture = CaptureThread(cap, self.capture_queue, self.stop_event)
+        self.inference = InferenceThread(infer, self.capture_queue, self.result_queue, self.stop_event)
+        self.latency = 0.0  # Capture-to-render latency of the last yielded frame (seconds)
+
+    @property
+    def dropped(self):
+        """Number of frames discarded by the drop policy so far."""
+        return self.capture_queue.dropped + self.result_queue.dropped
+
+    @property
+    def capture_failed(self):
+        return self.capture.failed
+
+    def start(self):
+        self.capture.start()
+        self.inference.start()
+        return self
+
+    def stop(self):
+        self.stop_event.set()
+        self.capture_queue.close()
+        self.result_queue.close()
+        self.inference.join(timeout=5)
+        self.capture.join(timeout=5)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def __iter__(self):
+        while True:
+            packet = self.result_queue.get(timeout=0.1)
+            if self.inference.error is not None:
+                raise self.inference.error
+            if packet is None:
+                if self.result_queue.drained() or self.stop_event.is_set():
+                    return
+                continue
+            index, t_capture, frame, results = packet
+            self.latency = time.perf_counter() - t_capture
+            yield frame, results
@@ -0,0 +1,159 @@
+##### Adaptive inference scheduling #####
+
+# Description:
+# Avoids running a full forward pass on every frame. A cheap motion gate compares a small grayscale
+# copy of each frame with the frame of the last detection: when the counter scene has not changed, the
+# last detections are reused as they are. Otherwise a full detection runs every N frames, and the
+# frames in between get the last boxes carried forward by a constant-velocity tracker. N adapts to the
+# measured frame-to-frame motion (more motion -> detect more often) and to the inference latency
+# budget (slow inference -> detect less often).
+
+import math
+import time
+
+import cv2
+import numpy as np
+
+from counter.detections import DetectionBatch
+
+
+class MotionGate:
+    """Mean absolute difference between downscaled grayscale frames, in gray levels (0-255)."""
+
+    def __init__(self, width=160):
+        self.width = width
+        self.previous = None
+        self.reference = None
+
+    def small(self, frame):
+        h, w = frame.shape[:2]
+        height = max(1, round(h * self.width / w))
+        small = cv2.resize(frame, (self.width, height), interpolation=cv2.INTER_AREA)
+        return cv2.cvtColor(small, cv2.COLOR_BGR2GRAY) if small.ndim == 3 else small
+
+    def measure(self, frame):
+        """Return (motion since the previous frame, change since the reference frame)."""
+        small = self.small(frame)
+        previous, self.previous = self.previous, small
+        if previous is None or self.reference is None:
+            return math.inf, math.inf
+        return float(cv2.absdiff(small, previous).mean()), float(cv2.absdiff(small, self.reference).mean())
+
+    def set_reference(self):
+        """Use the most recently measured frame as the reference for scene changes."""
+        self.reference = self.previous
+
+
+class BoxCarrier:
+    """Constant-velocity tracker that moves the last detected boxes forward between full detections.
+
+    Velocities are estimated per track id from the last two detections, so boxes without a track id
+    (id -1) or seen for the first time stay where they were detected. The ids must come from a tracker
+    that persists between detections (model.track(persist=True)); with persistent_ids=False the ids
+    can't be matched across detections and every box stays where it was detected.
+    """
+
+    def __init__(self, persistent_ids=True):
+        self.persistent_ids = persistent_ids
+        self.detections = DetectionBatch.empty()
+        self.velocity = np.zeros((0, 4), np.float32)
+        self.frame_index = 0
+        self._last_boxes = {}  # track id -> (box, frame index)
+
+    def update(self, detections, frame_index):
+        velocity = np.zeros((len(detections), 4), np.float32)
+        last_boxes = {}
+        if not self.persistent_ids:
+            detections = DetectionBatch(detections.xyxy, detections.cls, detections.conf,
+                                        np.full(len(detections), -1, np.int32))
+        for i, (box, track_id) in enumerate(zip(detections.xyxy, detections.ids.tolist())):
+            if track_id < 0:
+                continue
+            previous = self._last_boxes.get(track_id)
+            if previous is not None and frame_index > previous[1]:
+                velocity[i] = (box - previous[0]) / (frame_index - previous[1])
+            last_boxes[track_id] = (box, frame_index)
+        self._last_boxes = last_boxes
+        self.detections = detections
+        self.velocity = velocity
+        self.frame_index = frame_index
+
+    def predict(self, frame_index, frame_shape):
+        """Detections extrapolated to frame_index and clipped to the frame."""
+        d = self.detections
+        if len(d) == 0 or not self.velocity.any():
+            return d
+        h, w = frame_shape[:2]
+        xyxy = d.xyxy + self.velocity * (frame_index - self.frame_index)
+        xyxy = np.clip(xyxy, 0, [w - 1, h - 1, w - 1, h - 1]).astype(np.int32)
+        return DetectionBatch(xyxy, d.cls, d.conf, d.ids)
+
+
+class AdaptiveScheduler:
+    """Decides per frame whether to run the detector, carry boxes forward or reuse the last result.
+
+    detect_every -- fixed detection interval N used when adaptive=False
+    adaptive -- enable the motion gate and adapt N between 1 and max_interval
+    motion_thresh -- mean gray-level change below which the scene counts as static
+    latency_budget_ms -- target average inference cost per frame; slow inference raises N to fit it
+    max_idle -- run a full detection at least this often even if the scene looks static
+    persistent_ids -- the detector's track ids persist between calls, so boxes can be carried forward
+    """
+
+    def __init__(self, detect_every=1, adaptive=False, max_interval=10, motion_thresh=2.0, latency_budget_ms=50.0,
+                 max_idle=150, persistent_ids=True):
+        self.adaptive = adaptive
+        self.interval = max(1, detect_every)
+        self.min_interval = 1 if adaptive else self.interval
+        self.max_interval = max(max_interval, self.interval) if adaptive else self.interval
+        self.motion_thresh = motion_thresh
+        self.budget = latency_budget_ms / 1000.0
+        self.max_idle = max_idle
+        self.gate = MotionGate() if adaptive else None
+        self.carrier = BoxCarrier(persistent_ids)
+        self.inference_time = 0.0  # Exponential moving average of the detector's run time (seconds)
+        self.frame_index = -1
+        self.last_detect = None
+        self.counts = {'detect': 0, 'carry': 0, 'reuse': 0}
+
+    def _adapt(self, motion):
+        # Fewer detections when slow inference would blow the latency budget
+        n_budget = math.ceil(self.inference_time / self.budget) if self.budget > 0 else self.max_interval
+        # More detections the faster things move in front of the camera
+        n_motion = self.max_interval if motion <= self.motion_thresh else int(self.max_interval * self.motion_thresh / motion)
+        self.interval = min(self.max_interval, max(self.min_interval, n_budget, n_motion))
+
+    def step(self, frame, detect):
+        """Return a DetectionBatch for frame, calling detect(frame) only when a full detection is due."""
+        self.frame_index += 1
+        since_detect = self.frame_index - self.last_detect if self.last_detect is not None else math.inf
+
+        if self.gate is not None:
+            motion, change = self.gate.measure(frame)
+            if since_detect < math.inf:
+                if change < self.motion_thresh and since_detect < self.max_idle:
+                    self.counts['reuse'] += 1
+                    return self.carrier.detections
+                self._adapt(motion)
+
+        if since_detect < self.interval:
+            self.counts['carry'] += 1
+            return self.carrier.predict(self.frame_index, frame.shape)
+
+        start = time.perf_counter()
+        detections = detect(frame)
+        elapsed = time.perf_counter() - start
+        self.inference_time = elapsed if self.last_detect is None else 0.8 * self.inference_time + 0.2 * elapsed
+        self.carrier.update(detections, self.frame_index)
+        self.last_detect = self.frame_index
+        if self.gate is not None:
+            self.gate.set_reference()
+        self.counts['detect'] += 1
+        return detections
+
+    def summary(self):
+        total = sum(self.counts.values())
+        if not total:
+            return 'No frames scheduled.'
+        return (f'Ran the detector on {self.counts["detect"]} of {total} frames '
+                f'({self.counts["carry"]} carried forward, {self.counts["reuse"]} static).')
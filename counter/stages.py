@@ -0,0 +1,65 @@
+##### Per-frame stages #####
+
+# Description:
+# The work the counter does on every frame once it has been captured: scheduled inference, moving the
+# detections to the host, picking up catalog edits and drawing. medecine_info_counter.py runs its camera,
+# pipeline, offline and multi-stream modes through FrameStages, and benchmarks/bench_counter.py times
+# the same object, so the benchmark covers exactly the code the counter runs.
+
+from counter.detections import DetectionBatch
+from counter.drawing import draw_detections
+from counter.metrics import Metrics, draw_hud
+from counter.overlay import OverlayCache
+from counter.scheduler import AdaptiveScheduler
+
+
+class FrameStages:
+    """Inference, post-processing and drawing for one frame at a time, timed into metrics.
+
+    model -- YOLO model (or anything with the same track() API and a names map)
+    catalog -- Catalog of brand info; edits to its file are picked up in annotate()
+    min_thresh -- minimum confidence of the detections that are kept
+    metrics -- Metrics the stages are timed into (a disabled one by default)
+    scheduler -- AdaptiveScheduler deciding when the detector runs (every frame by default)
+    overlay_cache -- OverlayCache of label sprites and info panels (built from catalog by default)
+    hud -- draw FPS and per-stage latency on every annotated frame
+    """
+
+    def __init__(self, model, catalog, min_thresh=0.5, metrics=None, scheduler=None, overlay_cache=None, hud=False):
+        self.model = model
+        self.labels = model.names
+        self.catalog = catalog
+        self.min_thresh = min_thresh
+        self.metrics = metrics if metrics is not None else Metrics(enabled=False)
+        self.scheduler = scheduler if scheduler is not None else AdaptiveScheduler()
+        self.overlay_cache = overlay_cache if overlay_cache is not None else OverlayCache(catalog.__getitem__)
+        self.hud = hud
+
+    def postprocess(self, result):
+        # Move boxes, classes, confidences and track IDs to the host in one transfer and drop low-confidence boxes
+        with self.metrics.stage('postprocess'):
+            return DetectionBatch.from_boxes(result.boxes, self.min_thresh)
+
+    def detect(self, frame):
+        # Run inference on frame with tracking enabled. persist=True keeps one tracker across calls, so track
+        # ids stay the same from one detection to the next (the scheduler's box carrier relies on this)
+        with self.metrics.stage('inference'):
+            results = self.model.track(frame, persist=True, verbose=False)
+        return self.postprocess(results[0])
+
+    def infer(self, frame):
+        # Run the detector, or let the scheduler reuse or carry forward earlier detections
+        return self.scheduler.step(frame, self.detect)
+
+    def annotate(self, frame, detections):
+        # Pick up edits to the catalog file; cached panels hold the old text so drop them
+        if self.catalog.maybe_reload():
+            self.overlay_cache.clear()
+
+        with self.metrics.stage('drawing'):
+            frame = draw_detections(frame, detections, self.labels, self.overlay_cache)
+
+        self.metrics.frame_done(len(detections))
+        if self.hud:
+            draw_hud(frame, self.metrics)
+        return frame
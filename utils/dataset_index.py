@@ -0,0 +1,304 @@
+# Index a YOLO dataset folder
+#
+# Walks images/ and labels/ once, parses every label .txt file in bulk into NumPy arrays and flags
+# malformed or out-of-range boxes, images without labels and labels without images. The index, with
+# per-class instance counts, is cached in <datapath>/.dataset_index.npz and rebuilt only when a file
+# is added or removed or its modification time changes. train_val_split.py (stratified by the classes
+# actually in the label files) and create_data_yaml() both read from this index.
+#
+# Example:
+#   python utils/dataset_index.py --datapath custom_data
+
+import os
+import sys
+import argparse
+
+import numpy as np
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png')
+CACHE_NAME = '.dataset_index.npz'
+CACHE_VERSION = 1
+
+
+def scan_files(root, extensions):
+    # Recursively list files under root with the given extensions: {relative path without suffix: (path, size, mtime_ns)}
+    found = {}
+    stack = [root]
+    while stack:
+        folder = stack.pop()
+        try:
+            entries = list(os.scandir(folder))
+        except FileNotFoundError:
+            continue
+        for entry in entries:
+            if entry.is_dir():
+                stack.append(entry.path)
+            elif entry.name.lower().endswith(extensions):
+                stat = entry.stat()
+                key = os.path.splitext(os.path.relpath(entry.path, root))[0].replace(os.sep, '/')
+                found[key] = (entry.path, stat.st_size, stat.st_mtime_ns)
+    return found
+
+
+def read_classes(data_path):
+    # Class names from classes.txt, if the dataset has one
+    classes_txt = os.path.join(data_path, 'classes.txt')
+    if not os.path.exists(classes_txt):
+        return None
+    with open(classes_txt, 'r') as f:
+        return [line.strip() for line in f if line.strip()]
+
+
+def parse_labels(label_paths):
+    # Parse all label files into one (N, 5) [class, x, y, w, h] array.
+    # Returns (boxes, per-file box counts, problems). Lines that are not 5 numbers are reported and skipped.
+    lines = []
+    counts = np.zeros(len(label_paths), np.int64)
+    problems = []
+    for i, path in enumerate(label_paths):
+        if path is None:
+            continue
+        with open(path, 'r') as f:
+            file_lines = [line for line in f.read().splitlines() if line.strip()]
+        good = [line for line in file_lines if len(line.split()) == 5]
+        if len(good) != len(file_lines):
+            problems.append((path, f'{len(file_lines) - len(good)} lines do not have 5 values'))
+        counts[i] = len(good)
+        lines.extend(good)
+
+    # Convert all values of all files in one NumPy call instead of a float() call per value
+    try:
+        values = np.array(' '.join(lines).split(), dtype=np.float64)
+        return values.reshape(-1, 5).astype(np.float32), counts, problems
+    except ValueError:
+        pass
+
+    # Some value is not a number: fall back to parsing file by file to find the bad lines
+    boxes = []
+    start = 0
+    for i, path in enumerate(label_paths):
+        kept = 0
+        for line in lines[start:start + counts[i]]:
+            try:
+                boxes.append([float(v) for v in line.split()])
+                kept += 1
+            except ValueError:
+                problems.append((path, f'non-numeric value in line "{line.strip()}"'))
+        start += counts[i]
+        counts[i] = kept
+    return np.array(boxes, np.float32).reshape(-1, 5), counts, problems
+
+
+class DatasetIndex:
+    # Images, their label files and all label boxes of a dataset folder.
+    #   images[i], labels[i]   -- image path and label path (None if the image has no label file)
+    #   boxes                  -- (N, 5) float32 [class, x_center, y_center, width, height] of all images
+    #   box_offsets            -- boxes of image i are boxes[box_offsets[i]:box_offsets[i + 1]]
+    #   signatures             -- (n_images, 3) int64 [image size, image mtime, label mtime]
+    #   bad_boxes              -- bool mask over boxes that are out of range (class id or coordinates)
+    #   orphan_labels          -- label files without a matching image
+    #   problems               -- (path, message) pairs for malformed label files
+
+    def __init__(self, root, images, labels, boxes, box_offsets, signatures, bad_boxes, orphan_labels, problems,
+                 num_classes):
+        self.root = root
+        self.images = images
+        self.labels = labels
+        self.boxes = boxes
+        self.box_offsets = box_offsets
+        self.signatures = signatures
+        self.bad_boxes = bad_boxes
+        self.orphan_labels = orphan_labels
+        self.problems = problems
+        self.num_classes = num_classes
+
+    def __len__(self):
+        return len(self.images)
+
+    @property
+    def box_image(self):
+        # Image index of every box
+        return np.repeat(np.arange(len(self.images)), np.diff(self.box_offsets))
+
+    def class_counts(self):
+        # Number of valid box instances per class
+        cls = self.boxes[~self.bad_boxes, 0].astype(np.int64)
+        return np.bincount(cls, minlength=self.num_classes or 0)
+
+    def stratify_classes(self):
+        # One class per image for stratified splitting: the globally rarest class the image contains
+        # (so rare classes end up on both sides of the split), or -1 for background images
+        counts = self.class_counts()
+        valid = ~self.bad_boxes
+        cls = self.boxes[:, 0].astype(np.int64)
+        rarity = np.where(valid, counts[np.clip(cls, 0, len(counts) - 1)] if len(counts) else 0, np.iinfo(np.int64).max)
+        result = np.full(len(self.images), -1, np.int64)
+        order = np.lexsort((-rarity, self.box_image))  # Per image, rarest class last
+        if len(order):
+            last = np.r_[self.box_image[order][1:] != self.box_image[order][:-1], True]
+            picks = order[last]
+            keep = valid[picks]
+            result[self.box_image[picks][keep]] = cls[picks][keep]
+        return result
+
+    def report(self, class_names=None):
+        # Human-readable summary
+        counts = self.class_counts()
+        lines = [f'{len(self.images)} images, {sum(label is not None for label in self.labels)} with labels, '
+                 f'{len(self.boxes)} boxes.']
+        for class_id, count in enumerate(counts):
+            name = class_names[class_id] if class_names and class_id < len(class_names) else str(class_id)
+            lines.append(f'  {name}: {count} instances')
+        unlabeled = sum(label is None for label in self.labels)
+        if unlabeled:
+            lines.append(f'{unlabeled} images have no label file (treated as background images).')
+        if self.orphan_labels:
+            lines.append(f'{len(self.orphan_labels)} label files have no image, e.g. {self.orphan_labels[0]}')
+        if self.bad_boxes.any():
+            bad_files = sorted({self.labels[i] for i in np.unique(self.box_image[self.bad_boxes])})
+            lines.append(f'{int(self.bad_boxes.sum())} boxes have an out-of-range class id or coordinates, '
+                         f'in {len(bad_files)} files, e.g. {bad_files[0]}')
+        for path, message in self.problems:
+            lines.append(f'Malformed label file {path}: {message}')
+        return '\n'.join(lines)
+
+
+def build_index(data_path, num_classes=None):
+    # Walk images/ and labels/ of data_path and parse all labels
+    image_root = os.path.join(data_path, 'images')
+    label_root = os.path.join(data_path, 'labels')
+    image_files = scan_files(image_root, IMAGE_EXTENSIONS)
+    label_files = scan_files(label_root, ('.txt',))
+
+    # Match labels to images by relative path, falling back to the bare file name for flat label folders
+    flat_labels = {}
+    for key, value in label_files.items():
+        flat_labels.setdefault(key.rsplit('/', 1)[-1], value)
+    keys = sorted(image_files)
+    images, labels, signatures, used = [], [], [], set()
+    for key in keys:
+        path, size, mtime = image_files[key]
+        label = label_files.get(key) or flat_labels.get(key.rsplit('/', 1)[-1])
+        images.append(path)
+        labels.append(label[0] if label else None)
+        signatures.append((size, mtime, label[2] if label else 0))
+        if label:
+            used.add(label[0])
+    orphan_labels = sorted(value[0] for value in label_files.values() if value[0] not in used)
+
+    boxes, counts, problems = parse_labels(labels)
+    box_offsets = np.concatenate([[0], np.cumsum(counts)]).astype(np.int64)
+
+    # Flag boxes with a non-integer or out-of-range class id, or coordinates outside the image
+    cls = boxes[:, 0]
+    bad = (cls < 0) | (cls != np.round(cls))
+    if num_classes is not None:
+        bad |= cls >= num_classes
+    bad |= ((boxes[:, 1:] < 0) | (boxes[:, 1:] > 1)).any(axis=1)
+    bad |= (boxes[:, 3] <= 0) | (boxes[:, 4] <= 0)
+    if num_classes is None:
+        valid_cls = cls[~bad]
+        num_classes = int(valid_cls.max()) + 1 if len(valid_cls) else 0
+
+    return DatasetIndex(data_path, images, labels, boxes, box_offsets, np.array(signatures, np.int64).reshape(-1, 3),
+                        bad, orphan_labels, problems, num_classes)
+
+
+def save_index(index, cache_path):
+    np.savez(cache_path, version=CACHE_VERSION, root=index.root, images=np.array(index.images, dtype=str),
+             labels=np.array([label or '' for label in index.labels], dtype=str), boxes=index.boxes,
+             box_offsets=index.box_offsets, signatures=index.signatures, bad_boxes=index.bad_boxes,
+             orphan_labels=np.array(index.orphan_labels, dtype=str),
+             problem_paths=np.array([p for p, _ in index.problems], dtype=str),
+             problem_messages=np.array([m for _, m in index.problems], dtype=str), num_classes=index.num_classes)
+
+
+def load_index(data_path, num_classes=None, use_cache=True):
+    # Index of data_path, read from the cache file unless a file was added, removed or modified since
+    classes = read_classes(data_path)
+    if num_classes is None and classes:
+        num_classes = len(classes)
+    cache_path = os.path.join(data_path, CACHE_NAME)
+
+    if use_cache and os.path.exists(cache_path):
+        try:
+            cached = np.load(cache_path)
+            fresh = (int(cached['version']) == CACHE_VERSION and
+                     (num_classes is None or int(cached['num_classes']) == num_classes))
+            if fresh:
+                # Cheap re-walk (no label parsing) to compare the file lists and modification times
+                image_files = scan_files(os.path.join(data_path, 'images'), IMAGE_EXTENSIONS)
+                label_files = scan_files(os.path.join(data_path, 'labels'), ('.txt',))
+                labels = [label or None for label in cached['labels'].tolist()]
+                label_mtimes = {value[0]: value[2] for value in label_files.values()}
+                current = sorted((value[0], value[1], value[2]) for value in image_files.values())
+                recorded = sorted(zip(cached['images'].tolist(), cached['signatures'][:, 0].tolist(),
+                                      cached['signatures'][:, 1].tolist()))
+                fresh = (current == recorded and
+                         len(label_files) == sum(label is not None for label in labels) + len(cached['orphan_labels']) and
+                         all(label is None or label_mtimes.get(label) == mtime
+                             for label, mtime in zip(labels, cached['signatures'][:, 2].tolist())))
+            if fresh:
+                return DatasetIndex(str(cached['root']), cached['images'].tolist(), labels, cached['boxes'],
+                                    cached['box_offsets'], cached['signatures'], cached['bad_boxes'],
+                                    cached['orphan_labels'].tolist(),
+                                    list(zip(cached['problem_paths'].tolist(), cached['problem_messages'].tolist())),
+                                    int(cached['num_classes']))
+        except (OSError, KeyError, ValueError):
+            pass  # Unreadable or outdated cache: rebuild it
+
+    index = build_index(data_path, num_classes)
+    try:
+        save_index(index, cache_path)
+    except OSError as e:
+        print(f'WARNING: Could not write index cache {cache_path}: {e}')
+    return index
+
+
+def create_data_yaml(path_to_classes_txt, path_to_data_yaml, data_dir='data', yaml_data_path=None):
+    # Write the Ultralytics data.yaml for the train/validation split in data_dir, and warn about classes
+    # that have no instances in either split (counted from the label files, not guessed from file names)
+    import yaml
+
+    if not os.path.exists(path_to_classes_txt):
+        print(f'classes.txt file not found! Please create a classes.txt labelmap and move it to {path_to_classes_txt}')
+        return
+    with open(path_to_classes_txt, 'r') as f:
+        classes = [line.strip() for line in f if line.strip()]
+
+    for split in ['train', 'validation']:
+        split_path = os.path.join(data_dir, split)
+        if not os.path.isdir(split_path):
+            print(f'WARNING: {split_path} not found, so its class counts could not be checked.')
+            continue
+        counts = load_index(split_path, num_classes=len(classes)).class_counts()
+        missing = [classes[i] for i in range(len(classes)) if counts[i] == 0]
+        if missing:
+            print(f'Warning: no {split} instances of: {", ".join(missing)}')
+
+    data = {
+        'path': yaml_data_path or os.path.abspath(data_dir),
+        'train': 'train/images',
+        'val': 'validation/images',
+        'nc': len(classes),
+        'names': classes
+    }
+    with open(path_to_data_yaml, 'w') as f:
+        yaml.dump(data, f, sort_keys=False)
+    print(f'Created config file at {path_to_data_yaml}')
+
+
+if __name__ == '__main__':
+    # Define and parse user input arguments
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--datapath', help='Path to data folder containing images and labels folders', required=True)
+    parser.add_argument('--nc', help='Number of classes (default: read from classes.txt)', type=int, default=None)
+    parser.add_argument('--rebuild', help='Ignore the cached index and re-parse every label file', action='store_true')
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.datapath):
+        print('Directory specified by --datapath not found. Verify the path is correct and try again.')
+        sys.exit(0)
+
+    index = load_index(args.datapath, num_classes=args.nc, use_cache=not args.rebuild)
+    print(index.report(read_classes(args.datapath)))
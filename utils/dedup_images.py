@@ -0,0 +1,216 @@
+# Find near-duplicate images with perceptual hashes
+#
+# Burst shots of the same pill box are nearly identical. If they end up on both sides of the split,
+# validation mAP is inflated, and training spends time on redundant samples. This tool computes a
+# 64-bit perceptual hash (pHash) of every image in a process pool. It decodes JPEGs at reduced size,
+# so each hash is cheap. The hashes are kept in a persistent index (<datapath>/.phash_index.npz);
+# only new or changed images are hashed on later runs. Near-duplicates are found with multi-index
+# hashing: the hash is cut into 4 16-bit chunks, and two hashes within Hamming distance r must
+# differ by at most r // 4 bits in at least one chunk. So candidates come from a few sorted-table
+# lookups per image instead of a comparison with every other image. train_val_split.py --dedup uses
+# the resulting clusters to keep duplicates on one side of the split, and optionally thins them.
+#
+# Example:
+#   python utils/dedup_images.py --datapath custom_data --threshold 6 --report duplicates.json
+
+from concurrent.futures import ProcessPoolExecutor
+from itertools import combinations
+import os
+import sys
+import json
+import argparse
+
+import cv2
+import numpy as np
+
+from dataset_index import IMAGE_EXTENSIONS, scan_files
+
+CACHE_NAME = '.phash_index.npz'
+NUM_CHUNKS = 4
+CHUNK_BITS = 64 // NUM_CHUNKS
+
+
+def phash(path):
+    # 64-bit DCT perceptual hash of an image, decoded at reduced size. Returns 0 for unreadable images.
+    img = cv2.imread(path, cv2.IMREAD_REDUCED_GRAYSCALE_4)
+    if img is None:
+        img = cv2.imread(path, cv2.IMREAD_GRAYSCALE)
+        if img is None:
+            return 0
+    small = cv2.resize(img, (32, 32), interpolation=cv2.INTER_AREA).astype(np.float32)
+    low = cv2.dct(small)[:8, :8].flatten()
+    bits = low > np.median(low[1:])
+    return int(np.packbits(bits).view('>u8')[0])
+
+
+def hash_images(paths, workers=None):
+    # Hash many images across a process pool
+    if not paths:
+        return np.zeros(0, np.uint64)
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        chunksize = max(1, min(256, len(paths) // (4 * (workers or os.cpu_count() or 1)) or 1))
+        return np.array(list(executor.map(phash, paths, chunksize=chunksize)), np.uint64)
+
+
+def popcount(x):
+    # Number of set bits of every element of a uint64 array
+    if hasattr(np, 'bitwise_count'):
+        return np.bitwise_count(x)
+    return np.unpackbits(x.view(np.uint8).reshape(-1, 8), axis=1).sum(axis=1)
+
+
+def chunk_masks(radius):
+    # All CHUNK_BITS-bit masks with at most radius bits set
+    masks = [0]
+    for r in range(1, radius + 1):
+        masks.extend(sum(1 << b for b in bits) for bits in combinations(range(CHUNK_BITS), r))
+    return np.array(masks, np.uint64)
+
+
+class HashIndex:
+    # Perceptual hashes of a dataset's images with multi-index hash tables for near-duplicate search
+
+    def __init__(self, paths, signatures, hashes):
+        self.paths = list(paths)
+        self.signatures = np.asarray(signatures, np.int64).reshape(-1, 2)
+        self.hashes = np.asarray(hashes, np.uint64)
+        # One sorted table per chunk: chunk values in sorted order and the image each belongs to
+        self.tables = []
+        for c in range(NUM_CHUNKS):
+            values = self.chunk(self.hashes, c)
+            order = np.argsort(values, kind='stable')
+            self.tables.append((values[order], order))
+
+    def __len__(self):
+        return len(self.paths)
+
+    @staticmethod
+    def chunk(hashes, c):
+        return (hashes >> np.uint64(c * CHUNK_BITS)) & np.uint64((1 << CHUNK_BITS) - 1)
+
+    def candidates(self, queries, threshold):
+        # (query index, image index) pairs whose hashes may be within threshold bits, found by table lookups
+        masks = chunk_masks(threshold // NUM_CHUNKS)
+        found_q, found_i = [], []
+        for c, (values, order) in enumerate(self.tables):
+            keys = self.chunk(queries, c)
+            for mask in masks:
+                probe = keys ^ mask
+                lo = np.searchsorted(values, probe, 'left')
+                hi = np.searchsorted(values, probe, 'right')
+                counts = hi - lo
+                hit = counts > 0
+                if not hit.any():
+                    continue
+                q = np.repeat(np.nonzero(hit)[0], counts[hit])
+                starts = np.repeat(lo[hit], counts[hit])
+                within = np.arange(len(q)) - np.repeat(np.cumsum(counts[hit]) - counts[hit], counts[hit])
+                found_q.append(q)
+                found_i.append(order[starts + within])
+        if not found_q:
+            return np.zeros(0, np.int64), np.zeros(0, np.int64)
+        return np.concatenate(found_q), np.concatenate(found_i)
+
+    def query(self, hashes, threshold=6):
+        # Images within threshold bits of each query hash, as (query index, image index, distance) arrays
+        hashes = np.atleast_1d(np.asarray(hashes, np.uint64))
+        q, i = self.candidates(hashes, threshold)
+        dist = popcount(hashes[q] ^ self.hashes[i]).astype(np.int64)
+        keep = dist <= threshold
+        # A pair can be found through several chunks; keep each once
+        _, first = np.unique(q[keep] * len(self) + i[keep], return_index=True)
+        return q[keep][first], i[keep][first], dist[keep][first]
+
+    def duplicate_pairs(self, threshold=6, block=20000):
+        # All pairs (i < j) of indexed images within threshold bits of each other
+        valid = self.hashes != 0  # Unreadable images hash to 0; don't pair them with each other
+        pairs = []
+        for start in range(0, len(self), block):
+            q, i, _ = self.query(self.hashes[start:start + block], threshold)
+            q = q + start
+            keep = (q < i) & valid[q] & valid[i]
+            pairs.append(np.stack([q[keep], i[keep]], axis=1))
+        return np.concatenate(pairs) if pairs else np.zeros((0, 2), np.int64)
+
+    def clusters(self, threshold=6):
+        # Cluster id of every image: connected components of the near-duplicate graph
+        parent = np.arange(len(self))
+
+        def find(x):
+            while parent[x] != x:
+                parent[x] = parent[parent[x]]
+                x = parent[x]
+            return x
+
+        for a, b in self.duplicate_pairs(threshold).tolist():
+            ra, rb = find(a), find(b)
+            if ra != rb:
+                parent[max(ra, rb)] = min(ra, rb)
+        return np.array([find(x) for x in range(len(self))], np.int64)
+
+
+def load_hash_index(data_path, workers=None, use_cache=True):
+    # Hash index of <data_path>/images, re-hashing only images that are new or changed since the cached run
+    image_files = scan_files(os.path.join(data_path, 'images'), IMAGE_EXTENSIONS)
+    entries = sorted(image_files.values())
+    paths = [path for path, _, _ in entries]
+    signatures = np.array([(size, mtime) for _, size, mtime in entries], np.int64).reshape(-1, 2)
+    hashes = np.zeros(len(paths), np.uint64)
+    todo = list(range(len(paths)))
+
+    cache_path = os.path.join(data_path, CACHE_NAME)
+    if use_cache and os.path.exists(cache_path):
+        try:
+            cached = np.load(cache_path)
+            known = {(path, size, mtime): h for path, (size, mtime), h in
+                     zip(cached['paths'].tolist(), cached['signatures'].tolist(), cached['hashes'].tolist())}
+            todo = []
+            for i, (path, (size, mtime)) in enumerate(zip(paths, signatures.tolist())):
+                h = known.get((path, size, mtime))
+                if h is None:
+                    todo.append(i)
+                else:
+                    hashes[i] = h
+        except (OSError, KeyError, ValueError):
+            todo = list(range(len(paths)))
+
+    if todo:
+        print(f'Hashing {len(todo)} new or changed images...')
+        hashes[todo] = hash_images([paths[i] for i in todo], workers)
+        try:
+            np.savez(cache_path, paths=np.array(paths, dtype=str), signatures=signatures, hashes=hashes)
+        except OSError as e:
+            print(f'WARNING: Could not write hash cache {cache_path}: {e}')
+    return HashIndex(paths, signatures, hashes)
+
+
+if __name__ == '__main__':
+    # Define and parse user input arguments
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--datapath', help='Path to data folder containing an images folder', required=True)
+    parser.add_argument('--threshold', help='Max Hamming distance (of 64 bits) for two images to count as '
+                        'near-duplicates', type=int, default=6)
+    parser.add_argument('--workers', help='Number of processes used for hashing (default: number of CPUs)', type=int,
+                        default=None)
+    parser.add_argument('--report', help='Write the duplicate clusters to this JSON file', default=None)
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.datapath):
+        print('Directory specified by --datapath not found. Verify the path is correct and try again.')
+        sys.exit(0)
+
+    index = load_hash_index(args.datapath, args.workers)
+    labels = index.clusters(args.threshold)
+    ids, counts = np.unique(labels, return_counts=True)
+    dup_clusters = ids[counts > 1]
+    members = {int(c): [] for c in dup_clusters}
+    for i, c in enumerate(labels.tolist()):
+        if c in members:
+            members[c].append(os.path.relpath(index.paths[i], args.datapath))
+
+    redundant = int(counts[counts > 1].sum() - len(dup_clusters))
+    print(f'{len(index)} images, {len(dup_clusters)} near-duplicate clusters, {redundant} redundant images.')
+    if args.report:
+        with open(args.report, 'w') as f:
+            json.dump(sorted(members.values(), key=len, reverse=True), f, indent=1)
+        print(f'Wrote clusters to {args.report}')
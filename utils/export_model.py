@@ -0,0 +1,174 @@
+# Export the trained model to CPU-friendly formats and compare them against the original weights
+#
+# Converts my_model.pt to ONNX and/or OpenVINO for the --backend option of medecine_info_counter.py.
+# With --int8, static post-training INT8 quantization is also done, calibrated on images from the
+# validation split (ONNX Runtime's quantize_static for ONNX, NNCF through Ultralytics for OpenVINO).
+# With --compare, every model is validated on the validation split and mAP and per-image latency are
+# reported next to the original PyTorch weights.
+#
+# Example:
+#   python utils/export_model.py --model my_model.pt --formats onnx openvino --int8 --compare
+
+from pathlib import Path
+import os
+import sys
+import json
+import argparse
+import tempfile
+
+import cv2
+import numpy as np
+import yaml
+from ultralytics import YOLO
+
+# Define and parse user input arguments
+parser = argparse.ArgumentParser()
+parser.add_argument('--model', help='Path to trained PyTorch weights (example: "my_model.pt")', default='my_model.pt')
+parser.add_argument('--formats', help='Formats to export to', nargs='+', choices=['onnx', 'openvino'],
+                    default=['onnx', 'openvino'])
+parser.add_argument('--int8', help='Also write INT8-quantized models calibrated on the validation images',
+                    action='store_true')
+parser.add_argument('--datapath', help='Folder containing the train and validation splits', default='data')
+parser.add_argument('--data_yaml', help='Existing data.yaml to use instead of generating one from --datapath',
+                    default=None)
+parser.add_argument('--imgsz', help='Input resolution the models are exported at', type=int, default=640)
+parser.add_argument('--calib_images', help='Max number of validation images used for INT8 calibration', type=int,
+                    default=300)
+parser.add_argument('--compare', help='Validate every model on the validation split and report mAP and latency',
+                    action='store_true')
+parser.add_argument('--report', help='File to write the comparison to as JSON', default='export_report.json')
+
+args = parser.parse_args()
+
+model_path = args.model
+stem = os.path.splitext(model_path)[0]
+val_image_path = os.path.join(args.datapath, 'validation', 'images')
+
+# Check for valid entries
+if not os.path.isfile(model_path):
+    print('Model specified by --model not found. Verify the path is correct and try again.')
+    sys.exit(0)
+if (args.int8 or args.compare) and args.data_yaml is None and not os.path.isdir(val_image_path):
+    print(f'Validation images not found at {val_image_path}. Run the train/val split first or pass --datapath.')
+    sys.exit(0)
+
+
+def letterbox(img, size):
+    # Resize keeping the aspect ratio and pad to size x size, like Ultralytics' preprocessing
+    h, w = img.shape[:2]
+    scale = min(size / h, size / w)
+    nh, nw = round(h * scale), round(w * scale)
+    img = cv2.resize(img, (nw, nh), interpolation=cv2.INTER_LINEAR)
+    top, left = (size - nh) // 2, (size - nw) // 2
+    return cv2.copyMakeBorder(img, top, size - nh - top, left, size - nw - left, cv2.BORDER_CONSTANT,
+                              value=(114, 114, 114))
+
+
+def calibration_images(image_dir, limit):
+    # Evenly spaced sample of the validation images so calibration covers the whole split
+    paths = sorted(path for path in Path(image_dir).rglob('*') if path.suffix.lower() in ['.jpg', '.jpeg', '.png'])
+    if len(paths) > limit:
+        paths = [paths[i] for i in np.linspace(0, len(paths) - 1, limit).astype(int)]
+    return paths
+
+
+def quantize_onnx(onnx_path, int8_path, image_dir, imgsz, limit):
+    # Static INT8 quantization with ONNX Runtime, calibrated on validation images
+    from onnxruntime.quantization import CalibrationDataReader, QuantFormat, QuantType, quantize_static
+    import onnxruntime
+
+    input_name = onnxruntime.InferenceSession(onnx_path, providers=['CPUExecutionProvider']).get_inputs()[0].name
+
+    class ValidationReader(CalibrationDataReader):
+        def __init__(self):
+            self.paths = iter(calibration_images(image_dir, limit))
+
+        def get_next(self):
+            for path in self.paths:
+                img = cv2.imread(str(path))
+                if img is None:
+                    continue
+                img = letterbox(img, imgsz)[:, :, ::-1].transpose(2, 0, 1)  # BGR HWC -> RGB CHW
+                return {input_name: np.ascontiguousarray(img, dtype=np.float32)[None] / 255.0}
+            return None
+
+    quantize_static(onnx_path, int8_path, ValidationReader(), quant_format=QuantFormat.QDQ, per_channel=True,
+                    activation_type=QuantType.QUInt8, weight_type=QuantType.QInt8)
+
+
+def make_data_yaml(model, datapath):
+    # Minimal data.yaml pointing at the split folders, with class names taken from the model
+    data = {
+        'path': os.path.abspath(datapath),
+        'train': 'train/images',
+        'val': 'validation/images',
+        'nc': len(model.names),
+        'names': [model.names[i] for i in range(len(model.names))],
+    }
+    f = tempfile.NamedTemporaryFile('w', suffix='.yaml', delete=False)
+    yaml.dump(data, f, sort_keys=False)
+    f.close()
+    return f.name
+
+
+def val_images_from_yaml(data_yaml):
+    # Folder of validation images referenced by a data.yaml
+    with open(data_yaml, 'r') as f:
+        data = yaml.safe_load(f)
+    root = data.get('path') or os.path.dirname(os.path.abspath(data_yaml))
+    val = data['val'][0] if isinstance(data['val'], list) else data['val']
+    return val if os.path.isabs(val) else os.path.join(root, val)
+
+
+model = YOLO(model_path, task='detect')
+data_yaml = args.data_yaml or make_data_yaml(model, args.datapath)
+calib_image_path = val_images_from_yaml(args.data_yaml) if args.data_yaml else val_image_path
+exported = {'pytorch': model_path}
+
+# Export to each requested format
+for fmt in args.formats:
+    print(f'Exporting {model_path} to {fmt}...')
+    # Dynamic input shapes, so the counter's batched modes (--source/--streams) can send several frames per call
+    exported[fmt] = YOLO(model_path, task='detect').export(format=fmt, imgsz=args.imgsz, dynamic=True)
+
+    if not args.int8:
+        continue
+    print(f'Quantizing {fmt} model to INT8...')
+    if fmt == 'onnx':
+        int8_path = f'{stem}_int8.onnx'
+        quantize_onnx(exported['onnx'], int8_path, calib_image_path, args.imgsz, args.calib_images)
+        exported['onnx_int8'] = int8_path
+    elif fmt == 'openvino':
+        # Ultralytics runs NNCF post-training quantization on the val split of data_yaml
+        exported['openvino_int8'] = YOLO(model_path, task='detect').export(
+            format='openvino', imgsz=args.imgsz, dynamic=True, int8=True, data=data_yaml, fraction=1.0)
+
+for name, path in exported.items():
+    print(f'{name:>14}: {path}')
+
+# Compare accuracy and latency of every model on the validation split
+if args.compare:
+    report = {}
+    for name, path in exported.items():
+        print(f'Validating {name}...')
+        metrics = YOLO(path, task='detect').val(data=data_yaml, imgsz=args.imgsz, batch=1, device='cpu',
+                                                 plots=False, verbose=False)
+        report[name] = {
+            'path': str(path),
+            'mAP50': round(float(metrics.box.map50), 4),
+            'mAP50-95': round(float(metrics.box.map), 4),
+            'inference_ms': round(float(metrics.speed['inference']), 2),
+            'total_ms': round(float(sum(metrics.speed.values())), 2),
+        }
+
+    baseline = report['pytorch']
+    print(f'\n{"model":>14} {"mAP50":>7} {"mAP50-95":>9} {"infer ms":>9} {"speedup":>8}')
+    for name, row in report.items():
+        row['speedup'] = round(baseline['inference_ms'] / row['inference_ms'], 2) if row['inference_ms'] else None
+        row['mAP50-95_delta'] = round(row['mAP50-95'] - baseline['mAP50-95'], 4)
+        print(f'{name:>14} {row["mAP50"]:>7.4f} {row["mAP50-95"]:>9.4f} {row["inference_ms"]:>9.2f} '
+              f'{row["speedup"]:>7.2f}x')
+
+    with open(args.report, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f'\nWrote comparison to {args.report}')
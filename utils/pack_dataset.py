@@ -0,0 +1,216 @@
+# Pack the train/validation split into a few large shard files
+#
+# Tens of thousands of small image and label files are slow to copy, unzip and open on network and
+# overlay filesystems. This tool writes each split as a small number of sequential shard files (the
+# encoded images back to back) plus one .npz index holding every sample's shard, byte offset and
+# length, and its label boxes. With --imgsz the images are letterboxed to the training size (and labels
+# adjusted) while packing, so oversized photos aren't decoded at full resolution every epoch. Shards
+# are written by a process pool, one shard per task. ShardReader memory-maps the shards and streams
+# samples straight out of them.
+#
+# Example:
+#   python utils/pack_dataset.py --datapath data --output data_packed --imgsz 640
+#   reader = ShardReader('data_packed', 'train'); image, boxes = reader[0]
+
+from concurrent.futures import ProcessPoolExecutor
+import os
+import sys
+import mmap
+import argparse
+
+import cv2
+import numpy as np
+
+from dataset_index import load_index
+
+
+def letterbox(img, size):
+    # Resize keeping the aspect ratio and pad to size x size. Returns (image, scale, left, top).
+    h, w = img.shape[:2]
+    scale = min(size / h, size / w)
+    nh, nw = round(h * scale), round(w * scale)
+    if (nh, nw) != (h, w):
+        img = cv2.resize(img, (nw, nh), interpolation=cv2.INTER_AREA if scale < 1 else cv2.INTER_LINEAR)
+    top, left = (size - nh) // 2, (size - nw) // 2
+    img = cv2.copyMakeBorder(img, top, size - nh - top, left, size - nw - left, cv2.BORDER_CONSTANT,
+                             value=(114, 114, 114))
+    return img, scale, left, top
+
+
+def letterbox_boxes(boxes, w0, h0, scale, left, top, size):
+    # Map normalized YOLO boxes of a w0 x h0 image onto its size x size letterboxed version
+    out = boxes.copy()
+    out[:, 1] = (boxes[:, 1] * w0 * scale + left) / size
+    out[:, 2] = (boxes[:, 2] * h0 * scale + top) / size
+    out[:, 3] = boxes[:, 3] * w0 * scale / size
+    out[:, 4] = boxes[:, 4] * h0 * scale / size
+    return out
+
+
+def write_shard(task):
+    # Write one shard file. Returns per-sample (offset, length, height, width) and the (possibly adjusted) boxes.
+    shard_path, samples, imgsz, quality = task
+    records = []
+    boxes_out = []
+    offset = 0
+    with open(shard_path, 'wb') as f:
+        for img_path, boxes in samples:
+            if imgsz:
+                img = cv2.imread(img_path)
+                if img is None:
+                    records.append((offset, 0, 0, 0))
+                    boxes_out.append(boxes[:0])
+                    continue
+                h0, w0 = img.shape[:2]
+                img, scale, left, top = letterbox(img, imgsz)
+                data = cv2.imencode('.jpg', img, [cv2.IMWRITE_JPEG_QUALITY, quality])[1].tobytes()
+                boxes = letterbox_boxes(boxes, w0, h0, scale, left, top, imgsz)
+                height, width = imgsz, imgsz
+            else:
+                with open(img_path, 'rb') as img_file:
+                    data = img_file.read()
+                height, width = 0, 0  # Unknown without decoding; stored images keep their original size
+            f.write(data)
+            records.append((offset, len(data), height, width))
+            boxes_out.append(boxes)
+            offset += len(data)
+    return records, boxes_out
+
+
+def plan_shards(index, shard_bytes):
+    # Group consecutive samples into shards of roughly shard_bytes of source image data
+    shards = []
+    current, current_bytes = [], 0
+    for i, size in enumerate(index.signatures[:, 0].tolist()):
+        if current and current_bytes + size > shard_bytes:
+            shards.append(current)
+            current, current_bytes = [], 0
+        current.append(i)
+        current_bytes += size
+    if current:
+        shards.append(current)
+    return shards
+
+
+def pack_split(split_path, output_path, split, imgsz=None, quality=95, shard_mb=256, workers=None):
+    # Pack one split folder (with images/ and labels/) into <output>/<split>-NNNNN.bin shards and <split>.index.npz
+    index = load_index(split_path)
+    valid = ~index.bad_boxes
+    shards = plan_shards(index, shard_mb * 1024 * 1024)
+    tasks = []
+    for shard_id, sample_ids in enumerate(shards):
+        samples = []
+        for i in sample_ids:
+            start, end = index.box_offsets[i], index.box_offsets[i + 1]
+            samples.append((index.images[i], index.boxes[start:end][valid[start:end]]))
+        tasks.append((os.path.join(output_path, f'{split}-{shard_id:05d}.bin'), samples, imgsz, quality))
+
+    shard_of, records, boxes = [], [], []
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for shard_id, (shard_records, shard_boxes) in enumerate(executor.map(write_shard, tasks)):
+            shard_of.extend([shard_id] * len(shard_records))
+            records.extend(shard_records)
+            boxes.extend(shard_boxes)
+
+    records = np.array(records, np.int64).reshape(-1, 4)
+    counts = np.array([len(b) for b in boxes], np.int64)
+    np.savez(os.path.join(output_path, f'{split}.index.npz'),
+             names=np.array([os.path.relpath(path, split_path) for path in index.images], dtype=str),
+             shard=np.array(shard_of, np.int32), offset=records[:, 0], length=records[:, 1],
+             height=records[:, 2].astype(np.int32), width=records[:, 3].astype(np.int32),
+             box_offsets=np.concatenate([[0], np.cumsum(counts)]).astype(np.int64),
+             boxes=np.concatenate(boxes).astype(np.float32) if boxes else np.zeros((0, 5), np.float32),
+             num_shards=len(tasks), imgsz=imgsz or 0)
+    skipped = int((records[:, 1] == 0).sum())
+    return len(records), len(tasks), skipped
+
+
+class ShardReader:
+    # Random-access and streaming reader for a packed split.
+    #   reader[i]            -> (BGR image, (n, 5) [class, x, y, w, h] boxes)
+    #   reader.raw(i)        -> encoded image bytes (a memoryview into the shard, no copy)
+    #   reader.stream(...)   -> yields (name, image, boxes), reading shards sequentially
+
+    def __init__(self, packed_path, split):
+        index = np.load(os.path.join(packed_path, f'{split}.index.npz'))
+        self.names = index['names']
+        self.shard = index['shard']
+        self.offset = index['offset']
+        self.length = index['length']
+        self.box_offsets = index['box_offsets']
+        self.boxes = index['boxes']
+        self.imgsz = int(index['imgsz'])
+        self._files = []
+        self._maps = []
+        for shard_id in range(int(index['num_shards'])):
+            f = open(os.path.join(packed_path, f'{split}-{shard_id:05d}.bin'), 'rb')
+            self._files.append(f)
+            self._maps.append(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if os.fstat(f.fileno()).st_size else b'')
+
+    def __len__(self):
+        return len(self.names)
+
+    def raw(self, i):
+        start = self.offset[i]
+        return memoryview(self._maps[self.shard[i]])[start:start + self.length[i]]
+
+    def labels(self, i):
+        return self.boxes[self.box_offsets[i]:self.box_offsets[i + 1]]
+
+    def __getitem__(self, i):
+        data = np.frombuffer(self.raw(i), np.uint8)
+        image = cv2.imdecode(data, cv2.IMREAD_COLOR) if len(data) else None
+        return image, self.labels(i)
+
+    def stream(self, shuffle_shards=False, seed=0):
+        # Read shard by shard in file order (optionally visiting shards in a random order) for sequential I/O
+        shard_ids = np.arange(len(self._maps))
+        if shuffle_shards:
+            np.random.default_rng(seed).shuffle(shard_ids)
+        order = np.argsort(self.shard, kind='stable')
+        bounds = np.searchsorted(self.shard[order], np.arange(len(self._maps) + 1))
+        for shard_id in shard_ids:
+            for i in order[bounds[shard_id]:bounds[shard_id + 1]]:
+                image, boxes = self[i]
+                if image is not None:
+                    yield str(self.names[i]), image, boxes
+
+    def close(self):
+        for m in self._maps:
+            if isinstance(m, mmap.mmap):
+                m.close()
+        for f in self._files:
+            f.close()
+
+
+if __name__ == '__main__':
+    # Define and parse user input arguments
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--datapath', help='Folder containing the train and validation split folders', default='data')
+    parser.add_argument('--splits', help='Split folders to pack', nargs='+', default=['train', 'validation'])
+    parser.add_argument('--output', help='Folder to write shards and indexes to', default='data_packed')
+    parser.add_argument('--imgsz', help='Letterbox images to this training size while packing (example: "640")',
+                        type=int, default=None)
+    parser.add_argument('--quality', help='JPEG quality of letterboxed images', type=int, default=95)
+    parser.add_argument('--shard_mb', help='Approximate size of each shard in MB of source images', type=int,
+                        default=256)
+    parser.add_argument('--workers', help='Number of processes writing shards (default: number of CPUs)', type=int,
+                        default=None)
+    args = parser.parse_args()
+
+    # Check for valid entries
+    if not os.path.isdir(args.datapath):
+        print('Directory specified by --datapath not found. Verify the path is correct and try again.')
+        sys.exit(0)
+    os.makedirs(args.output, exist_ok=True)
+
+    for split in args.splits:
+        split_path = os.path.join(args.datapath, split)
+        if not os.path.isdir(split_path):
+            print(f'Split folder {split_path} not found, skipping it.')
+            continue
+        num_samples, num_shards, skipped = pack_split(split_path, args.output, split, args.imgsz, args.quality,
+                                                      args.shard_mb, args.workers)
+        print(f'Packed {num_samples} {split} images into {num_shards} shards in {args.output}.')
+        if skipped:
+            print(f'WARNING: {skipped} images could not be read and were stored empty.')
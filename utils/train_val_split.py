@@ -1,86 +1,273 @@
 # Split between train and val folders
+#
+# Randomly splits a dataset of images and YOLO label files into data/train and data/validation,
+# by default stratified by the classes in the label files (read through the cached index of
+# dataset_index.py) so every class is split in the same ratio. The split is shuffled once with a
+# seeded RNG (linear time and reproducible), files are placed by a thread pool, and --mode can
+# hardlink, symlink or reflink files instead of copying them so a split doesn't duplicate the
+# images on disk. A manifest (data/split_manifest.json) records where each image went, so
+# re-running after new images arrive only processes added or changed files and leaves existing
+# assignments alone. With --dedup, near-duplicate images (perceptual hashes of dedup_images.py
+# within --dedup_threshold bits) are clustered and each cluster goes to a single split, so copies
+# of one shot can't end up on both sides; --thin keeps at most K images of each cluster.
 
 from pathlib import Path
-import random
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 import os
 import sys
+import json
+import random
 import shutil
 import argparse
+from collections import Counter
+
+from dataset_index import load_index, read_classes
+FICLONE = 0x40049409  # Linux ioctl that makes dst share src's data blocks (btrfs, XFS, ...)
+reflink_failed = []
+
+
+def reflink(src, dst):
+    import fcntl
+    with open(src, 'rb') as fsrc, open(dst, 'wb') as fdst:
+        fcntl.ioctl(fdst.fileno(), FICLONE, fsrc.fileno())
+
+
+def place_file(src, dst, mode):
+    # Put src at dst using mode, replacing anything already there
+    if os.path.lexists(dst):
+        os.remove(dst)
+    if mode == 'hardlink':
+        os.link(src, dst)
+    elif mode == 'symlink':
+        os.symlink(os.path.abspath(src), dst)
+    elif mode == 'reflink' and not reflink_failed:
+        try:
+            reflink(src, dst)
+        except (OSError, ImportError) as e:
+            reflink_failed.append(e)
+            print(f'WARNING: Reflinks are not supported here ({e}). Copying files instead.')
+            shutil.copy(src, dst)
+    else:
+        shutil.copy(src, dst)
+
+
+def remove_file(path):
+    if os.path.lexists(path):
+        os.remove(path)
+
+
+def place_sample(task, split_paths, mode):
+    # Place one image and its annotation (if any) into its split folders
+    img_path, txt_path, split = task
+    img_dir, txt_dir = split_paths[split]
+    place_file(img_path, os.path.join(img_dir, img_path.name), mode)
+    txt_dst = os.path.join(txt_dir, img_path.stem + '.txt')
+    if txt_path is not None:
+        place_file(txt_path, txt_dst, mode)
+    else:  # If txt path does not exist, this is a background image, so drop any label left from an earlier run
+        remove_file(txt_dst)
+
+
+def main():
+    # Define and parse user input arguments
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--datapath', help='Path to data folder containing image and annotation files',
+                        required=True)
+    parser.add_argument('--train_pct', help='Ratio of images to go to train folder; \
+                        the rest go to validation folder (example: ".7")',
+                        default=.7)
+    parser.add_argument('--seed', help='Random seed, so the same dataset is always split the same way', type=int,
+                        default=0)
+    parser.add_argument('--stratify', help='Split each class separately. "label" takes the class from the label file '
+                        '(the rarest class in the image), "prefix" from the part of the file name before the first '
+                        'underscore',
+                        choices=['label', 'prefix', 'none'], default='label')
+    parser.add_argument('--mode', help='How files are placed in the split folders', choices=['copy', 'hardlink',
+                        'symlink', 'reflink'], default='copy')
+    parser.add_argument('--output', help='Folder to create the train and validation folders in', default='data')
+    parser.add_argument('--workers', help='Number of threads used to place files', type=int, default=16)
+    parser.add_argument('--dedup', help='Keep near-duplicate images together in the same split', action='store_true')
+    parser.add_argument('--dedup_threshold', help='Max Hamming distance (of 64 bits) between the perceptual hashes of '
+                        'two images for them to count as near-duplicates', type=int, default=6)
+    parser.add_argument('--thin', help='Keep at most this many images of each near-duplicate cluster (implies --dedup)',
+                        type=int, default=0)
+
+    args = parser.parse_args()
+
+    data_path = args.datapath
+    train_percent = float(args.train_pct)
+
+    # Check for valid entries
+    if not os.path.isdir(data_path):
+        print('Directory specified by --datapath not found. Verify the path is correct (and uses double back slashes if on Windows) and try again.')
+        sys.exit(0)
+
+    if train_percent < .01 or train_percent > 0.99:
+        print('Invalid entry for train_pct. Please enter a number between .01 and .99.')
+        sys.exit(0)
+
+    if args.thin < 0:
+        print('Invalid entry for thin. Please enter a positive number of images per cluster (or 0 to keep all).')
+        sys.exit(0)
+
+    # Define path to input dataset
+    input_image_path = os.path.join(data_path, 'images')
+    input_label_path = os.path.join(data_path, 'labels')
+
+    # Define paths to image and annotation folders
+    output_path = os.path.abspath(args.output)
+    split_paths = {
+        'train': (os.path.join(output_path, 'train/images'), os.path.join(output_path, 'train/labels')),
+        'validation': (os.path.join(output_path, 'validation/images'), os.path.join(output_path, 'validation/labels')),
+    }
+    manifest_path = os.path.join(output_path, 'split_manifest.json')
+
+    # Create folders if they don't already exist
+    for dir_path in [path for paths in split_paths.values() for path in paths]:
+        if not os.path.exists(dir_path):
+            os.makedirs(dir_path)
+            print(f'Created folder at {dir_path}.')
+
+    # Get list of all images and annotation files, with the classes in each label file
+    index = load_index(data_path)
+    classes = read_classes(data_path)
+    img_file_list = [Path(path) for path in index.images]
+
+    print(f'Number of image files: {len(img_file_list)}')
+    print(f'Number of annotation files: {sum(label is not None for label in index.labels) + len(index.orphan_labels)}')
+    if index.orphan_labels or index.problems or index.bad_boxes.any():
+        print('WARNING: The dataset has label problems. Run utils/dataset_index.py --datapath for details.')
+
+    # Load the manifest of a previous run, if any
+    manifest = {}
+    if os.path.exists(manifest_path):
+        with open(manifest_path, 'r') as f:
+            manifest = json.load(f).get('files', {})
+
+    current = {img_path.relative_to(input_image_path).as_posix(): i for i, img_path in enumerate(img_file_list)}
+    stratify_classes = index.stratify_classes() if args.stratify == 'label' else None
+
+    # Cluster near-duplicate images; without --dedup every image is a cluster of its own
+    cluster_of = {rel: rel for rel in current}
+    if args.dedup or args.thin:
+        from dedup_images import load_hash_index
+        hash_index = load_hash_index(data_path)
+        labels = hash_index.clusters(args.dedup_threshold)
+        for path, label in zip(hash_index.paths, labels.tolist()):
+            rel = Path(path).relative_to(input_image_path).as_posix()
+            if rel in cluster_of:
+                cluster_of[rel] = label
+    clusters = {}
+    for rel in current:
+        clusters.setdefault(cluster_of[rel], []).append(rel)
+
+    if args.dedup or args.thin:
+        num_dups = sum(len(members) - 1 for members in clusters.values())
+        print(f'Found {num_dups} near-duplicate images in {sum(len(m) > 1 for m in clusters.values())} clusters.')
+
+    # Thin each cluster down to --thin images, keeping the ones that were already split first
+    if args.thin:
+        thinned = 0
+        for key, members in clusters.items():
+            if len(members) > args.thin:
+                members.sort(key=lambda rel: rel not in manifest)
+                for rel in members[args.thin:]:
+                    del current[rel]
+                thinned += len(members) - args.thin
+                clusters[key] = members[:args.thin]
+        print(f'Thinned out {thinned} near-duplicate images (keeping at most {args.thin} per cluster).')
+
+    signatures = {rel: index.signatures[i].tolist() for rel, i in current.items()}
+
+    # Files removed from the dataset (or thinned out) since the last run are removed from the split folders too
+    removed = [rel for rel in manifest if rel not in current]
+    for rel in removed:
+        img_dir, txt_dir = split_paths[manifest[rel]['split']]
+        remove_file(os.path.join(img_dir, os.path.basename(rel)))
+        remove_file(os.path.join(txt_dir, Path(rel).stem + '.txt'))
+        del manifest[rel]
+
+    # Files that changed keep their split but are placed again; new files still need a split
+    changed = [rel for rel in current if rel in manifest and manifest[rel]['signature'] != signatures[rel]]
+    added = [rel for rel in current if rel not in manifest]
+
+
+    def group_key(rel):
+        if args.stratify == 'label':
+            class_id = int(stratify_classes[current[rel]])
+            if class_id < 0:
+                return 'background'
+            return classes[class_id] if classes and class_id < len(classes) else str(class_id)
+        return Path(rel).stem.split('_')[0] if args.stratify == 'prefix' else ''
+
+
+    # Group clusters by the class of their first image (with --stratify prefix, assuming the class name is the part of
+    # the filename before an underscore). New images of a cluster that was already split join its existing split.
+    groups = {}
+    straddling = 0
+    for members in clusters.values():
+        group = groups.setdefault(group_key(members[0]), {'existing_train': 0, 'total': 0, 'added': []})
+        group['total'] += len(members)
+        splits = Counter(manifest[rel]['split'] for rel in members if rel in manifest)
+        if not splits:
+            group['added'].append(members)
+            continue
+        straddling += len(splits) > 1
+        split = splits.most_common(1)[0][0]
+        for rel in members:
+            manifest.setdefault(rel, {'split': split})
+        group['existing_train'] += sum(manifest[rel]['split'] == 'train' for rel in members)
+
+    if straddling:
+        print(f'WARNING: {straddling} near-duplicate clusters were already split across train and validation by an '
+              f'earlier run. Delete {manifest_path} to re-split the whole dataset with --dedup.')
+
+    # Shuffle the new clusters of each group once and deal them out, sending each one to the split that leaves the
+    # number of training images closest to train_pct (a group's first cluster always goes to train)
+    rng = random.Random(args.seed)
+    for group_name, group in sorted(groups.items()):
+        new = group['added']
+        if not new:
+            continue
+        rng.shuffle(new)
+        # Round to the nearest image, but give every class at least one training image and, if it has more than
+        # one image, at least one validation image
+        target = min(max(int(group['total'] * train_percent + 0.5), 1), max(group['total'] - 1, 1))
+        target -= group['existing_train']
+        num_train = 0
+        for members in new:
+            first = group['existing_train'] + num_train == 0
+            closer = abs(num_train + len(members) - target) <= abs(num_train - target)
+            split = 'train' if first or closer else 'validation'
+            num_train += len(members) if split == 'train' else 0
+            for rel in members:
+                manifest[rel] = {'split': split}
+        if args.stratify != 'none':
+            num_new = sum(len(members) for members in new)
+            print(f'Class {group_name}: {num_new} new images, {num_train} for training, '
+                  f'{num_new - num_train} for validation.')
+
+    # Place new and changed files in parallel
+    tasks = [(img_file_list[current[rel]], index.labels[current[rel]], manifest[rel]['split'])
+             for rel in added + changed]
+    with ThreadPoolExecutor(max_workers=args.workers) as executor:
+        for _ in executor.map(partial(place_sample, split_paths=split_paths, mode=args.mode), tasks):
+            pass
+
+    for rel in current:
+        manifest[rel]['signature'] = signatures[rel]
+
+    # Save the manifest so the next run only processes what changed
+    with open(manifest_path, 'w') as f:
+        json.dump({'seed': args.seed, 'train_pct': train_percent, 'files': manifest}, f)
+
+    num_train = sum(entry['split'] == 'train' for entry in manifest.values())
+    print(f'Images moving to train: {num_train}')
+    print(f'Images moving to validation: {len(manifest) - num_train}')
+    print(f'{len(added)} new, {len(changed)} changed and {len(removed)} removed files since the last run.')
+    print('Image and annotation files have been successfully moved to train and validation directories.')
 
 
-# Define and parse user input arguments
-
-parser = argparse.ArgumentParser()
-parser.add_argument('--datapath', help='Path to data folder containing image and annotation files',
-                    required=True)
-parser.add_argument('--train_pct', help='Ratio of images to go to train folder; \
-                    the rest go to validation folder (example: ".7")',
-                    default=.7)
-
-args = parser.parse_args()
-
-data_path = args.datapath
-train_percent = float(args.train_pct)
-
-# Check for valid entries
-if not os.path.isdir(data_path):
-   print('Directory specified by --datapath not found. Verify the path is correct (and uses double back slashes if on Windows) and try again.')
-   sys.exit(0)
-if train_percent < .01 or train_percent > 0.99:
-   print('Invalid entry for train_pct. Please enter a number between .01 and .99.')
-   sys.exit(0)
-val_percent = 1 - train_percent
-
-# Define path to input dataset 
-input_image_path = os.path.join(data_path,'images')
-input_label_path = os.path.join(data_path,'labels')
-
-# Define paths to image and annotation folders
-cwd = os.getcwd()
-train_img_path = os.path.join(cwd,'data/train/images')
-train_txt_path = os.path.join(cwd,'data/train/labels')
-val_img_path = os.path.join(cwd,'data/validation/images')
-val_txt_path = os.path.join(cwd,'data/validation/labels')
-
-# Create folders if they don't already exist
-for dir_path in [train_img_path, train_txt_path, val_img_path, val_txt_path]:
-   if not os.path.exists(dir_path):
-      os.makedirs(dir_path)
-      print(f'Created folder at {dir_path}.')
-
-
-# Get list of all images and annotation files
-img_file_list = [path for path in Path(input_image_path).rglob('*')]
-txt_file_list = [path for path in Path(input_label_path).rglob('*')]
-
-print(f'Number of image files: {len(img_file_list)}')
-print(f'Number of annotation files: {len(txt_file_list)}')
-
-# Determine number of files to move to each folder
-file_num = len(img_file_list)
-train_num = int(file_num*train_percent)
-val_num = file_num - train_num
-print('Images moving to train: %d' % train_num)
-print('Images moving to validation: %d' % val_num)
-
-# Select files randomly and copy them to train or val folders
-for i, set_num in enumerate([train_num, val_num]):
-  for ii in range(set_num):
-    img_path = random.choice(img_file_list)
-    img_fn = img_path.name
-    base_fn = img_path.stem
-    txt_fn = base_fn + '.txt'
-    txt_path = os.path.join(input_label_path,txt_fn)
-
-    if i == 0: # Copy first set of files to train folders
-      new_img_path, new_txt_path = train_img_path, train_txt_path
-    elif i == 1: # Copy second set of files to the validation folders
-      new_img_path, new_txt_path = val_img_path, val_txt_path
-
-    shutil.copy(img_path, os.path.join(new_img_path,img_fn))
-    #os.rename(img_path, os.path.join(new_img_path,img_fn))
-    if os.path.exists(txt_path): # If txt path does not exist, this is a background image, so skip txt file
-      shutil.copy(txt_path,os.path.join(new_txt_path,txt_fn))
-      #os.rename(txt_path,os.path.join(new_txt_path,txt_fn))
-
-    img_file_list.remove(img_path)
+if __name__ == '__main__':
+    main()